@@ -3,17 +3,364 @@ AI Chatbot for Smart Manufacturing Dashboard
 Provides intelligent responses about manufacturing data and insights
 """
 
+import queue
 import random
 import re
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from kpi_engine import KPIQueryEngine
+from retrieval import STOPWORDS
+from storage import connect
+
+
+# Correctly spelled words within a typo or two of a topic keyword ("detect" is not a
+# misspelt "defect", nor "alter" of "alert"), which fuzzy matching must leave alone
+COMMON_WORDS = frozenset("""
+alter alters altered avert batter bitter broke broker brokers butter carton cartons
+commends critic deflect deflects defeat defeats detect detects detected detection guile
+guise poker poser powder powders qualify repaid resort retort scram scrip statue stats
+strap straps stratus summery toady unite united unity waning warming warring
+""".split())
+
+
+class FuzzyIndex:
+    """
+    Symmetric-delete index for typo-tolerant word lookup. Each word is stored under every
+    string left after deleting up to its allowed number of characters, so a lookup only
+    generates the query's own deletes and verifies the few words that share one, instead
+    of computing an edit distance against every word. Words in ``known`` are correctly
+    spelled in their own right and never looked up, and a typo has to keep the first
+    letter of the word it stands for ("lower" is not "power").
+    """
+    
+    MEMO_SIZE = 4096
+    
+    def __init__(self, words, known=()):
+        self.words = set(words)
+        self.known = frozenset(known)
+        self._deletes = {}
+        self._memo = {}
+        for word in self.words:
+            for variant in self._variants(word, self.max_edits(word)):
+                self._deletes.setdefault(variant, set()).add(word)
+    
+    @staticmethod
+    def max_edits(word):
+        # Short words tolerate no typos, otherwise "fix" would also answer "six"
+        if len(word) <= 4:
+            return 0
+        return 1 if len(word) <= 7 else 2
+    
+    @staticmethod
+    def _variants(word, edits):
+        variants = frontier = {word}
+        for _ in range(edits):
+            frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+            variants = variants | frontier
+        return variants
+    
+    @staticmethod
+    def distance(a, b, limit):
+        """
+        Optimal string alignment distance (Levenshtein plus adjacent transpositions),
+        computed only within ``limit`` of the diagonal; anything over it is limit + 1
+        """
+        
+        over = limit + 1
+        if abs(len(a) - len(b)) > limit:
+            return over
+        
+        before, previous = None, [min(j, over) for j in range(len(b) + 1)]
+        for i in range(1, len(a) + 1):
+            current = [min(i, over)] + [over] * len(b)
+            for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+                cost = a[i - 1] != b[j - 1]
+                value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    value = min(value, before[j - 2] + 1)
+                current[j] = min(value, over)
+            if min(current) == over:
+                return over
+            before, previous = previous, current
+        return previous[len(b)]
+    
+    def lookup(self, term):
+        """Closest indexed word within both words' typo allowance, or None"""
+        
+        if term in self.words:
+            return term
+        edits = self.max_edits(term)
+        if edits == 0 or term in self.known:
+            return None
+        
+        # The same typos come back query after query
+        if term in self._memo:
+            return self._memo[term]
+        if len(self._memo) >= self.MEMO_SIZE:
+            self._memo.clear()
+        
+        candidates = set()
+        for variant in self._variants(term, edits):
+            candidates.update(self._deletes.get(variant, ()))
+        
+        best = None
+        for word in candidates:
+            if word[0] != term[0]:
+                continue
+            limit = min(edits, self.max_edits(word))
+            distance = self.distance(term, word, limit)
+            if distance <= limit and (best is None or (distance, word) < best):
+                best = (distance, word)
+        self._memo[term] = best[1] if best else None
+        return self._memo[term]
+
+
+class KeywordMatcher:
+    """
+    Finds every topic keyword in a query with one compiled regex. Keywords are merged
+    into a character trie before compiling, so shared prefixes are tested once and
+    the cost of a match stays flat as the number of keywords grows.
+    """
+    
+    # A keyword reached through a typo counts for less than one spelled out
+    FUZZY_WEIGHT = 0.5
+    
+    def __init__(self, topic_keywords):
+        # A keyword may belong to several topics
+        self.topics = list(topic_keywords)
+        self.keyword_topics = {}
+        for topic, keywords in topic_keywords.items():
+            for keyword in keywords:
+                self.keyword_topics.setdefault(keyword.lower(), []).append(topic)
+        
+        trie = {}
+        for keyword in self.keyword_topics:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = True
+        
+        # Keywords must start on a word boundary ("fix" should not fire on "prefix");
+        # the trie pattern is greedy, so the longest keyword at a position wins
+        self.pattern = re.compile(r'\b' + self._trie_pattern(trie)) if trie else None
+        
+        # Single-word keywords can also be reached through a typo
+        self.fuzzy = FuzzyIndex((keyword for keyword in self.keyword_topics if keyword.isalpha()),
+                                known=COMMON_WORDS | STOPWORDS)
+    
+    @classmethod
+    def _trie_pattern(cls, node):
+        branches = [re.escape(char) + cls._trie_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A keyword ends here, so the longer continuations are optional
+            pattern = f'(?:{pattern})?'
+        return pattern
+    
+    def scores(self, query):
+        """Topics hit by the query, best first, as (topic, score) pairs"""
+        
+        if self.pattern is None:
+            return []
+        
+        # Score is the number of distinct keywords hit (typo hits weighted down); ties
+        # go to the earliest mention
+        query = query.lower()
+        hits, first_seen, spans = {}, {}, []
+        
+        def hit(keyword, position, weight=1.0):
+            for topic in self.keyword_topics.get(keyword, []):
+                keywords = hits.setdefault(topic, {})
+                keywords[keyword] = max(keywords.get(keyword, 0.0), weight)
+                first_seen[topic] = min(first_seen.get(topic, position), position)
+        
+        for match in self.pattern.finditer(query):
+            hit(match.group(), match.start())
+            spans.append(match.span())
+        
+        # Words the exact pass did not cover are retried for typos ("eneryg", "maintenence")
+        for word in re.finditer(r'[a-z]+', query):
+            if not any(start <= word.start() < end for start, end in spans):
+                keyword = self.fuzzy.lookup(word.group())
+                if keyword is not None:
+                    hit(keyword, word.start(), self.FUZZY_WEIGHT)
+        
+        return sorted(
+            ((topic, sum(keywords.values())) for topic, keywords in hits.items()),
+            key=lambda item: (-item[1], first_seen[item[0]])
+        )
+
+
+class ConversationHistory:
+    """
+    Chat turns of one session: the latest ``window`` turns are kept in a ring buffer,
+    and every turn is appended to an on-disk store that pages older turns on demand.
+    """
+    
+    def __init__(self, window=50, path=None):
+        self.conn = connect('conversations.db', path)
+        self._lock = threading.Lock()
+        self.session_id = uuid.uuid4().hex
+        self.recent = deque(maxlen=window)
+        self._count = 0
+        
+        with self._lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS turns (
+                    id INTEGER PRIMARY KEY,
+                    session TEXT NOT NULL,
+                    ts TEXT NOT NULL,
+                    user TEXT NOT NULL,
+                    assistant TEXT NOT NULL
+                )
+            ''')
+            # Pages walk one session's turns newest first
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_turns_session ON turns (session, id)')
+    
+    def append(self, user, assistant, timestamp=None):
+        """Record one question and its answer"""
+        
+        timestamp = timestamp or datetime.now()
+        turn = {
+            'timestamp': timestamp.strftime('%H:%M:%S'),
+            'user': user,
+            'assistant': assistant
+        }
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO turns (session, ts, user, assistant) VALUES (?, ?, ?, ?)',
+                (self.session_id, timestamp.isoformat(), user, assistant)
+            )
+            self._count += 1
+        self.recent.append(turn)
+        return turn
+    
+    def page(self, offset=0, limit=10):
+        """
+        Turns ``offset`` to ``offset + limit`` counted back from the newest, returned
+        oldest first. Pages inside the in-memory window never touch the disk.
+        """
+        
+        if offset + limit <= len(self.recent):
+            newest = len(self.recent) - offset
+            return [self.recent[i] for i in range(max(0, newest - limit), newest)]
+        
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT ts, user, assistant FROM turns WHERE session = ? ORDER BY id DESC LIMIT ? OFFSET ?',
+                (self.session_id, limit, offset)
+            ).fetchall()
+        return [
+            {'timestamp': datetime.fromisoformat(ts).strftime('%H:%M:%S'), 'user': user, 'assistant': assistant}
+            for ts, user, assistant in reversed(rows)
+        ]
+    
+    def clear(self):
+        """Start a new session; earlier turns stay on disk"""
+        self.session_id = uuid.uuid4().hex
+        self.recent.clear()
+        self._count = 0
+    
+    def __len__(self):
+        return self._count
+
+
+class ResponseCache:
+    """
+    LRU cache of rendered topic answers keyed by topic and the state of the KPI engine
+    behind them, so a question repeated before that state changes is only formatted
+    once. Each chatbot has its own cache: every session simulates its own plant, so
+    there is no plant state that answers of different sessions could share. Entries
+    also expire ``ttl`` seconds after they were rendered.
+    """
+    
+    def __init__(self, maxsize=256, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_or_render(self, key, render):
+        """Cached answer for ``key``, rendering (outside the lock) on a miss or expiry"""
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        response = render()
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return response
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
 
 class ManufacturingChatbot:
     """AI-powered chatbot for manufacturing analytics queries"""
     
-    def __init__(self):
+    # Most topics answered in one response when a question matches several equally
+    MAX_TOPICS = 2
+    
+    # Intent confidence needed to answer a topic none of the query's keywords point to
+    OVERRIDE_CONFIDENCE = 0.9
+    
+    # Knowledge-base passages offered when no topic matches
+    RETRIEVAL_K = 2
+    EXCERPT_CHARS = 400
+    
+    # Topics answered from live KPIs rather than static text
+    DATA_TOPICS = {'oee', 'maintenance', 'energy', 'quality', 'production', 'alert', 'anomaly', 'summary'}
+    
+    # Answers that depend only on the KPI engine's state; 'optimize' projects random gains each time
+    CACHED_TOPICS = DATA_TOPICS | {'help'}
+    
+    # Advice keyed by the KPI it addresses; the numbers around it come from the KPI engine
+    OEE_RECOMMENDATIONS = {
+        'availability': "Focus on reducing changeover time and unplanned stops to improve availability.",
+        'performance': "Consider implementing TPM to close the speed losses holding back performance.",
+        'quality': "Review quality inspection protocols; first-pass yield is the limiting factor."
+    }
+    ALERT_ACTIONS = {
+        'temperature': "Check the cooling system on {machine}",
+        'vibration': "Schedule a bearing and mounting inspection for {machine}",
+        'pressure': "Inspect the hydraulic relief valve on {machine}"
+    }
+    ROOT_CAUSES = {
+        'temperature': "Temperature excursions dominate - cooling efficiency may be reduced, check filters.",
+        'vibration': "Vibration deviations dominate - pattern suggests bearing wear or belt tension variation.",
+        'pressure': "Pressure deviations dominate - check the hydraulic pump and relief valves."
+    }
+    
+    def __init__(self, history_window=50, history_path=None, kpi_engine=None, retriever=None, classifier=None,
+                 response_cache=None):
         self.context = {}
-        self.conversation_history = []
+        self.history = ConversationHistory(history_window, history_path)
+        self.kpis = kpi_engine if kpi_engine is not None else KPIQueryEngine()
+        self.retriever = retriever
+        self.classifier = classifier
+        self.responses = response_cache if response_cache is not None else ResponseCache()
         
         # Knowledge base for manufacturing queries
         self.knowledge_base = {
@@ -73,7 +420,7 @@ Based on AI analysis of sensor data:
                 'response': """📈 **Production Analytics**
 
 📊 **Today's Output:** {units:,} units
-🎯 **Target Achievement:** {target_pct:.1f}%
+🎯 **Target Achievement:** {target_pct}
 ⏱️ **Average Cycle Time:** {cycle_time:.1f} seconds
 🏭 **Throughput:** {throughput:.0f} units/hour
 
@@ -95,7 +442,7 @@ Based on AI analysis of sensor data:
 
 📊 **Anomalies Detected (Last 24h):** {count}
 📈 **Anomaly Rate:** {rate:.2f}%
-🎯 **Model Confidence:** {confidence:.1f}%
+📏 **Mean Deviation:** {deviation}
 
 🚨 **Recent Anomalies:**
 {anomaly_list}
@@ -137,7 +484,7 @@ Just ask your question naturally!"""
 
 🏭 **Production:**
 - Units Produced: {units:,}
-- Target Achievement: {target_pct:.1f}%
+- Target Achievement: {target_pct}
 - OEE: {oee:.1f}%
 
 ⚡ **Energy:**
@@ -178,6 +525,9 @@ Based on current data analysis:
             }
         }
         
+        # Compiled once; matching a query is a single pass regardless of knowledge base size
+        self.matcher = KeywordMatcher({topic: info['keywords'] for topic, info in self.knowledge_base.items()})
+        
         # Default responses for unmatched queries
         self.default_responses = [
             "I understand you're asking about '{query}'. Could you be more specific? Try asking about OEE, energy, quality, production, or maintenance.",
@@ -191,101 +541,152 @@ Based on current data analysis:
     
     def get_response(self, user_query, dashboard_data=None):
         """Generate AI response based on user query"""
+        return ''.join(self.stream_response(user_query, dashboard_data))
+    
+    def stream_response(self, user_query, dashboard_data=None):
+        """
+        Generate the response piece by piece: each topic's answer (or knowledge-base
+        excerpt) is yielded as soon as it is ready. The full response is added to the
+        history once the last piece is out.
+        """
         
         if dashboard_data:
             self.context = dashboard_data
+            self.kpis.update(dashboard_data)
         
-        query_lower = user_query.lower().strip()
-        
-        # Find matching topic
-        matched_topic = None
-        for topic, info in self.knowledge_base.items():
-            for keyword in info['keywords']:
-                if keyword in query_lower:
-                    matched_topic = topic
-                    break
-            if matched_topic:
-                break
+        matched_topics = self.route(user_query.strip())
         
-        if matched_topic:
-            response = self._generate_response(matched_topic)
+        if matched_topics:
+            chunks = (
+                ('\n\n---\n\n' if i else '') + self._topic_response(topic)
+                for i, topic in enumerate(matched_topics)
+            )
         else:
-            response = random.choice(self.default_responses).format(query=user_query[:50])
+            # Fall back to the manuals, SOPs and work orders before giving up
+            passages = self.retriever.search(user_query, k=self.RETRIEVAL_K) if self.retriever is not None else []
+            if passages:
+                chunks = (('\n\n' if i else '') + section for i, section in enumerate(self._format_passages(passages)))
+            else:
+                chunks = iter([random.choice(self.default_responses).format(query=user_query[:50])])
+        
+        response = ''
+        for chunk in chunks:
+            response += chunk
+            yield chunk
         
         # Add to conversation history
-        self.conversation_history.append({
-            'timestamp': datetime.now().strftime('%H:%M:%S'),
-            'user': user_query,
-            'assistant': response
-        })
+        self.history.append(user_query, response)
+    
+    def route(self, query):
+        """Topics to answer a query with; empty when it belongs to the knowledge base or nowhere"""
         
-        return response
+        # Questions spanning several equally-matched keyword topics get each answer
+        ranked = self.matcher.scores(query)
+        topics = [topic for topic, score in ranked if score == ranked[0][1]][:self.MAX_TOPICS] if ranked else []
+        if self.classifier is None:
+            return topics
+        
+        intent, confidence = self.classifier.predict(query)
+        if not ranked:
+            # Without keyword hits, a confident intent prediction decides
+            if confidence >= self.classifier.threshold:
+                return [intent] if intent in self.knowledge_base else []
+            return topics
+        
+        # Keyword hits stand: the prediction breaks ties among them or, when confident,
+        # promotes another matched topic; it replaces them only when nearly certain
+        matched = [topic for topic, _ in ranked]
+        if intent in topics or (intent in matched and confidence >= self.classifier.threshold):
+            return ([intent] + [topic for topic in topics if topic != intent])[:self.MAX_TOPICS]
+        if confidence >= self.OVERRIDE_CONFIDENCE:
+            return [intent] if intent in self.knowledge_base else []
+        return topics
+    
+    def _format_passages(self, passages):
+        """Knowledge-base hits as response sections: heading, source file and an excerpt"""
+        
+        yield "📚 **From the plant knowledge base:**"
+        for passage in passages:
+            lines = [line.strip() for line in passage['text'].splitlines() if line.strip()]
+            title = passage['path']
+            if lines and lines[0].startswith('#'):
+                title = lines.pop(0).lstrip('#').strip()
+            body = ' '.join(line for line in lines if not line.startswith('#'))
+            if len(body) > self.EXCERPT_CHARS:
+                body = body[:self.EXCERPT_CHARS].rsplit(' ', 1)[0] + '…'
+            yield f"**{title}** — `{passage['path']}`\n\n{body}"
+    
+    def _topic_response(self, topic):
+        """A topic's answer, from the response cache while the engine's state is unchanged"""
+        
+        if topic not in self.CACHED_TOPICS:
+            return self._generate_response(topic)
+        state = self.kpis.state() if topic in self.DATA_TOPICS else None
+        return self.responses.get_or_render((topic, state), lambda: self._generate_response(topic))
     
     def _generate_response(self, topic):
         """Generate response with real data"""
         
         template = self.knowledge_base[topic]['response']
         
-        # Generate dynamic data based on topic
+        # Data topics are answered from the KPI engine, so they match the dashboard
+        if topic in self.DATA_TOPICS and self.kpis.current is None:
+            return "📡 I don't have live dashboard data yet. Ask me again once the dashboard has received its first reading."
+        
         if topic == 'oee':
-            oee = self.context.get('oee', random.uniform(78, 92))
-            availability = random.uniform(88, 96)
-            performance = random.uniform(85, 95)
-            quality = random.uniform(95, 99.5)
-            
-            recommendations = [
-                "Focus on reducing changeover time to improve availability.",
-                "Consider implementing TPM to boost performance.",
-                "Review quality inspection protocols on Line B.",
-                "Current performance is above target. Maintain current practices."
-            ]
+            kpi = self.kpis.query('oee')
+            if kpi['on_target']:
+                recommendation = "Current performance is above target. Maintain current practices."
+            else:
+                recommendation = self.OEE_RECOMMENDATIONS[kpi['weakest']]
             
             return template.format(
-                oee=oee,
-                availability=availability,
-                performance=performance,
-                quality=quality,
-                recommendation=random.choice(recommendations)
+                oee=kpi['oee'],
+                availability=kpi['availability'],
+                performance=kpi['performance'],
+                quality=kpi['quality'],
+                recommendation=recommendation
             )
         
         elif topic == 'maintenance':
-            equipment_list = [
-                "✅ CNC Machine #1: Healthy (92% health score)",
-                "✅ CNC Machine #2: Healthy (88% health score)",
-                "⚠️ CNC Machine #3: Attention needed (65% health score)",
-                "✅ Robot Arm A: Healthy (94% health score)",
-                "🔴 Press Machine: Maintenance due in 3 days"
-            ]
+            kpi = self.kpis.query('maintenance')
+            
+            equipment_list = []
+            for health in kpi['equipment'][:5]:
+                icon = "✅" if health['health_score'] >= 80 else "⚠️" if health['health_score'] >= 60 else "🔴"
+                equipment_list.append(f"{icon} {health['equipment']}: {health['health_score']:.0f}% health score")
             
             schedule = [
-                "• CNC Machine #3: Bearing replacement - Feb 5",
-                "• Press Machine: Full inspection - Feb 7",
-                "• Conveyor System: Belt check - Feb 10"
+                f"• {health['equipment']}: due in {health['days_until_maintenance']} days ({health['due_date']:%b %d})"
+                for health in kpi['due'][:3]
             ]
             
             return template.format(
-                equipment_status='\n'.join(equipment_list),
-                maintenance_schedule='\n'.join(schedule),
-                savings=random.randint(15000, 45000)
+                equipment_status='\n'.join(equipment_list) or "No equipment health data available",
+                maintenance_schedule='\n'.join(schedule) or "Nothing scheduled",
+                savings=kpi['savings']
             )
         
         elif topic == 'energy':
+            kpi = self.kpis.query('energy')
             recommendations = [
                 "• Shift peak operations to off-peak hours (10 PM - 6 AM)",
                 "• Install VFDs on main motors - potential 15% savings",
-                "• Fix compressed air leaks detected in Zone 3",
                 "• Optimize HVAC scheduling based on occupancy"
             ]
+            if kpi['peak_kw'] > kpi['average_kw'] * 1.1:
+                recommendations.insert(0, f"• Demand peaked at {kpi['peak_kw']:,.0f} kW - stagger machine start-ups to flatten it")
             
             return template.format(
-                today_kwh=random.uniform(15000, 18000),
-                peak_kw=random.uniform(800, 1200),
-                cost=random.uniform(1800, 2500),
-                carbon=random.uniform(8000, 12000),
+                today_kwh=kpi['today_kwh'],
+                peak_kw=kpi['peak_kw'],
+                cost=kpi['cost'],
+                carbon=kpi['carbon'],
                 recommendations='\n'.join(recommendations)
             )
         
         elif topic == 'quality':
+            kpi = self.kpis.query('quality')
             defect_types = [
                 "1. Surface scratches: 35%",
                 "2. Dimensional errors: 28%",
@@ -293,99 +694,86 @@ Based on current data analysis:
                 "4. Weld defects: 17%"
             ]
             
-            insights = [
-                "Temperature fluctuations on Line B correlate with increased defects.",
-                "Morning shift shows 15% better quality metrics than night shift.",
-                "Consider recalibrating sensors on Station 5.",
-                "Quality trending upward - maintain current process parameters."
-            ]
+            baseline = kpi['historical_defect_rate']
+            if baseline is None:
+                insight = f"Inspection accuracy is {kpi['inspection_accuracy']:.1f}%."
+            elif kpi['defect_rate'] > baseline:
+                insight = (f"Defect rate is above the 30-day average of {baseline:.2f}% - "
+                           "check process parameters on the worst-performing line.")
+            else:
+                insight = f"Defect rate is at or below the 30-day average of {baseline:.2f}% - maintain current process parameters."
             
             return template.format(
-                fpy=random.uniform(95, 99),
-                defect_rate=random.uniform(0.5, 1.5),
-                rework_rate=random.uniform(0.8, 2.0),
+                fpy=kpi['fpy'],
+                defect_rate=kpi['defect_rate'],
+                rework_rate=kpi['rework_rate'],
                 defect_types='\n'.join(defect_types),
-                insight=random.choice(insights)
+                insight=insight
             )
         
         elif topic == 'production':
+            kpi = self.kpis.query('production')
             line_production = [
-                "• Line A (Assembly): 1,350 units (102% of target)",
-                "• Line B (Welding): 1,180 units (94% of target)",
-                "• Line C (Painting): 980 units (98% of target)",
-                "• Line D (Packaging): 1,420 units (108% of target)"
+                f"• {stats['line']}: {stats['efficiency']:.1f}% efficiency ({stats['running']}/{stats['machines']} machines running)"
+                for stats in kpi['lines']
             ]
             
             return template.format(
-                units=random.randint(4500, 5500),
-                target_pct=random.uniform(92, 105),
-                cycle_time=random.uniform(12, 16),
-                throughput=random.uniform(200, 250),
-                line_production='\n'.join(line_production)
+                units=kpi['units'],
+                target_pct=f"{kpi['target_pct']:.1f}%" if kpi['target_pct'] is not None else "n/a",
+                cycle_time=kpi['cycle_time'] or 0,
+                throughput=kpi['throughput'],
+                line_production='\n'.join(line_production) or "No line data available"
             )
         
         elif topic == 'alert':
-            alerts = [
-                "🔴 CRITICAL: Temperature threshold exceeded on CNC #3",
-                "🟡 WARNING: Vibration anomaly on Robot Arm A",
-                "🟡 WARNING: Energy consumption 15% above baseline",
-                "🔵 INFO: Scheduled maintenance reminder for tomorrow"
-            ]
+            kpi = self.kpis.query('alerts')
+            icons = {'Critical': "🔴 CRITICAL", 'Warning': "🟡 WARNING", 'Info': "🔵 INFO"}
             
-            actions = [
-                "1. Immediately check CNC Machine #3 cooling system",
-                "2. Schedule inspection for Robot Arm A bearings",
-                "3. Review energy usage patterns for optimization",
-                "4. Confirm maintenance crew availability for tomorrow"
-            ]
+            alerts = [f"{icons.get(alert['severity'], alert['severity'])}: {alert['message']}" for alert in kpi['active']]
+            actions = []
+            for alert in kpi['active']:
+                action = self.ALERT_ACTIONS.get(alert.get('metric'), "Investigate {machine}").format(machine=alert.get('machine'))
+                if action not in actions:
+                    actions.append(action)
             
+            if not alerts:
+                return "✅ **No active alerts** - all systems operating normally."
+            
+            counts = ', '.join(f"{count} {severity.lower()}" for severity, count in kpi['counts'].items() if count)
             return template.format(
-                alerts='\n'.join(alerts),
-                actions='\n'.join(actions)
+                alerts=f"{kpi['total']} active ({counts}):\n" + '\n'.join(alerts),
+                actions='\n'.join(f"{i}. {action}" for i, action in enumerate(actions, 1))
             )
         
         elif topic == 'anomaly':
-            anomaly_list = [
-                "• 14:23 - Pressure spike on Hydraulic System (+45%)",
-                "• 11:47 - Temperature drift on Motor 2 (+12°C)",
-                "• 09:15 - Vibration pattern change on Conveyor"
-            ]
-            
-            root_causes = [
-                "Pattern suggests bearing degradation in hydraulic pump.",
-                "Cooling system efficiency may be reduced - check filters.",
-                "Likely caused by belt tension variation."
-            ]
+            kpi = self.kpis.query('anomalies')
+            anomaly_list = [f"• {alert['timestamp']:%H:%M} - {alert['message']}" for alert in kpi['recent']]
             
             return template.format(
-                count=random.randint(3, 12),
-                rate=random.uniform(0.5, 2.5),
-                confidence=random.uniform(92, 98),
-                anomaly_list='\n'.join(anomaly_list),
-                root_cause=random.choice(root_causes)
+                count=kpi['count'],
+                rate=kpi['rate'],
+                deviation=f"{kpi['mean_z']:.1f}σ" if kpi['mean_z'] is not None else "n/a",
+                anomaly_list='\n'.join(anomaly_list) or "• None in the last 24 hours",
+                root_cause=self.ROOT_CAUSES.get(kpi['top_metric'], "No recurring pattern detected.")
             )
         
         elif topic == 'summary':
-            health_statuses = ["Good", "Excellent", "Needs Attention"]
-            priorities = [
-                "Address CNC Machine #3 temperature warning",
-                "Complete scheduled maintenance on Press Machine",
-                "Review Line B quality metrics",
-                "All systems operating normally"
-            ]
+            kpi = self.kpis.query('summary')
+            next_due = kpi['next_maintenance']
             
             return template.format(
-                units=random.randint(4500, 5500),
-                target_pct=random.uniform(92, 105),
-                oee=random.uniform(78, 92),
-                energy=random.uniform(15000, 18000),
-                cost=random.uniform(1800, 2500),
-                fpy=random.uniform(95, 99),
-                defect_rate=random.uniform(0.5, 1.5),
-                health_status=random.choice(health_statuses),
-                next_maintenance="Feb 5, 2026",
-                alert_count=random.randint(2, 6),
-                priority=random.choice(priorities)
+                units=kpi['units'],
+                target_pct=f"{kpi['target_pct']:.1f}%" if kpi['target_pct'] is not None else "n/a",
+                oee=kpi['oee'],
+                energy=kpi['energy'],
+                cost=kpi['cost'],
+                fpy=kpi['fpy'],
+                defect_rate=kpi['defect_rate'],
+                health_status=kpi['health_status'],
+                next_maintenance=f"{next_due['equipment']} on {next_due['due_date']:%b %d}" if next_due else "None scheduled",
+                alert_count=kpi['alert_count'],
+                priority=kpi['priority']
             )
         
         elif topic == 'optimize':
@@ -422,9 +810,113 @@ Based on current data analysis:
         return template
     
     def get_conversation_history(self):
-        """Return conversation history"""
-        return self.conversation_history
+        """Return the most recent turns (older turns are paged with ``history.page``)"""
+        return list(self.history.recent)
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.history.clear()
+
+
+class ChatStream:
+    """
+    A query submitted to ChatbotService. Pieces of the answer arrive as the worker
+    produces them; ``text`` holds everything received so far.
+    """
+    
+    _END = object()
+    
+    def __init__(self, query):
+        self.query = query
+        self.text = ''
+        self.error = None
+        self._chunks = queue.Queue()
+        self._finished = False
+    
+    @property
+    def done(self):
+        """True once the whole answer (or an error) has been received"""
+        return self._finished
+    
+    def chunks(self, timeout=None):
+        """
+        Yield pieces of the answer as they arrive, until it is complete or ``timeout``
+        seconds pass without the answer completing; iterate again to resume.
+        """
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._finished:
+            # Once the time is up, pieces already queued are still taken without waiting
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                chunk = self._chunks.get(timeout=remaining)
+            except queue.Empty:
+                return
+            if chunk is self._END:
+                self._finished = True
+                return
+            self.text += chunk
+            yield chunk
+    
+    def poll(self):
+        """Take whatever has arrived without waiting; returns the text so far"""
+        for _ in self.chunks(timeout=0):
+            pass
+        return self.text
+    
+    def __iter__(self):
+        return self.chunks()
+
+
+class ChatbotService:
+    """
+    Answers chatbot queries on a worker pool, so a slow answer never holds up the
+    dashboard's script run. Queries to one chatbot are answered in submission order;
+    different sessions' chatbots are served concurrently.
+    """
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chatbot')
+        self._pending = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls):
+        """The process-wide service every dashboard session submits to"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def submit(self, chatbot, query, dashboard_data=None):
+        """Queue a query for ``chatbot``; returns a ChatStream of its answer"""
+        
+        stream = ChatStream(query)
+        with self._lock:
+            pending = self._pending.setdefault(chatbot, deque())
+            pending.append((stream, dashboard_data))
+            idle = len(pending) == 1
+        
+        # A chatbot's queue is drained by one task at a time
+        if idle:
+            self._executor.submit(self._drain, chatbot, pending)
+        return stream
+    
+    def _drain(self, chatbot, pending):
+        while True:
+            with self._lock:
+                stream, dashboard_data = pending[0]
+            try:
+                for chunk in chatbot.stream_response(stream.query, dashboard_data):
+                    stream._chunks.put(chunk)
+            except Exception as error:
+                stream.error = error
+            stream._chunks.put(ChatStream._END)
+            
+            with self._lock:
+                pending.popleft()
+                if not pending:
+                    return
@@ -0,0 +1,815 @@
+"""
+Alerting Engine for Smart Manufacturing Dashboard
+Evaluates threshold, rate-of-change and anomaly rules across all sensors on every tick
+and keeps a persistent, indexed alert history
+"""
+
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from storage import connect
+
+
+SEVERITIES = ['Critical', 'Warning', 'Info']
+
+# Sort key for severities: higher is more severe
+SEVERITY_RANK = {severity: len(SEVERITIES) - i for i, severity in enumerate(SEVERITIES)}
+
+# Rule definitions: 'direction' is the side of 'limit' that triggers the alert, and the
+# alert only clears once the signal crosses back over 'clear' (hysteresis band)
+DEFAULT_RULES = [
+    {
+        'name': 'temperature_critical', 'type': 'threshold', 'metric': 'temperature',
+        'severity': 'Critical', 'direction': 'above', 'limit': 85, 'clear': 80,
+        'message': 'Temperature threshold exceeded on {machine} ({value:.1f}°C)'
+    },
+    {
+        'name': 'temperature_warning', 'type': 'threshold', 'metric': 'temperature',
+        'severity': 'Warning', 'direction': 'above', 'limit': 78, 'clear': 74,
+        'message': 'Temperature running high on {machine} ({value:.1f}°C)'
+    },
+    {
+        'name': 'temperature_rise', 'type': 'rate', 'metric': 'temperature',
+        'severity': 'Info', 'direction': 'above', 'limit': 2.5, 'clear': 0.5, 'dedup_seconds': 600,
+        'message': 'Rapid temperature rise on {machine} ({value:+.1f}°C/s)'
+    },
+    {
+        'name': 'vibration_critical', 'type': 'threshold', 'metric': 'vibration',
+        'severity': 'Critical', 'direction': 'above', 'limit': 9.0, 'clear': 7.5,
+        'message': 'Vibration level critical on {machine} ({value:.1f} mm/s)'
+    },
+    {
+        'name': 'vibration_warning', 'type': 'threshold', 'metric': 'vibration',
+        'severity': 'Warning', 'direction': 'above', 'limit': 7.5, 'clear': 6.5,
+        'message': 'Vibration above warning threshold on {machine} ({value:.1f} mm/s)'
+    },
+    {
+        'name': 'pressure_high', 'type': 'threshold', 'metric': 'pressure',
+        'severity': 'Warning', 'direction': 'above', 'limit': 135, 'clear': 125,
+        'message': 'Hydraulic pressure high on {machine} ({value:.0f} PSI)'
+    },
+    {
+        'name': 'sensor_anomaly', 'type': 'anomaly', 'metric': '*',
+        'severity': 'Warning', 'direction': 'above', 'limit': 4.5, 'clear': 2.0, 'dedup_seconds': 900,
+        'message': 'Anomalous {metric} reading on {machine} (z = {value:.1f})'
+    }
+]
+
+
+def build_machine_sensors(machine_lines, metrics=('temperature', 'vibration', 'pressure')):
+    """Sensor catalogue (one entry per machine and metric) for the alert engine"""
+    return [
+        {'sensor': f"{machine} / {metric}", 'machine': machine, 'line': line, 'metric': metric}
+        for machine, line in machine_lines.items()
+        for metric in metrics
+    ]
+
+
+class AlertStore:
+    """
+    In-memory alert store indexed by severity, machine and active state. It holds at most
+    ``max_alerts`` alerts: the longest-cleared go first, and only if every remaining alert
+    is still active are the oldest active ones dropped (the history store keeps them).
+    The engine writes from the script thread while chatbot workers read, so every
+    method holds the store's lock and readers get lists, never live views.
+    """
+    
+    def __init__(self, max_alerts=5000):
+        self.max_alerts = max_alerts
+        self._alerts = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        
+        # Bumped on every add/resolve so readers can tell when the live alerts changed
+        self.version = 0
+        
+        # Dicts used as insertion-ordered sets of alert ids (O(1) add/remove, newest last)
+        self._by_severity = {severity: {} for severity in SEVERITIES}
+        self._by_machine = {}
+        self._active = {severity: {} for severity in SEVERITIES}
+        self._cleared = {}
+    
+    def add(self, alert):
+        """Insert a new alert and return its id"""
+        
+        alert = dict(alert)
+        alert.setdefault('status', 'Active')
+        alert.setdefault('cleared_at', None)
+        
+        with self._lock:
+            alert_id = self._next_id
+            self._next_id += 1
+            alert['id'] = alert_id
+            self._alerts[alert_id] = alert
+            
+            self._by_severity.setdefault(alert['severity'], {})[alert_id] = None
+            self._by_machine.setdefault(alert.get('machine'), {})[alert_id] = None
+            if alert['status'] == 'Active':
+                self._active.setdefault(alert['severity'], {})[alert_id] = None
+            else:
+                self._cleared[alert_id] = None
+            self.version += 1
+            
+            if len(self._alerts) > self.max_alerts:
+                self._evict()
+        
+        return alert_id
+    
+    def resolve(self, alert_id, timestamp=None):
+        """Mark an active alert as cleared"""
+        
+        with self._lock:
+            alert = self._alerts.get(alert_id)
+            if alert is None or alert['status'] != 'Active':
+                return
+            
+            alert['status'] = 'Cleared'
+            alert['cleared_at'] = timestamp or datetime.now()
+            self._active[alert['severity']].pop(alert_id, None)
+            self._cleared[alert_id] = None
+            self.version += 1
+    
+    def _evict(self):
+        """Drop alerts past the bound: longest-cleared first, then the oldest active ones (lock held)"""
+        
+        while len(self._alerts) > self.max_alerts:
+            if self._cleared:
+                alert_id = next(iter(self._cleared))
+                del self._cleared[alert_id]
+            else:
+                alert_id = next(iter(self._alerts))
+            alert = self._alerts.pop(alert_id)
+            self._by_severity[alert['severity']].pop(alert_id, None)
+            self._by_machine[alert.get('machine')].pop(alert_id, None)
+            self._active[alert['severity']].pop(alert_id, None)
+    
+    def get(self, alert_id):
+        """Look up a single alert"""
+        with self._lock:
+            return self._alerts.get(alert_id)
+    
+    def count_active(self, severity=None):
+        """Number of active alerts, optionally for one severity"""
+        with self._lock:
+            if severity is not None:
+                return len(self._active.get(severity, {}))
+            return sum(len(ids) for ids in self._active.values())
+    
+    def active(self, severities=None, limit=None):
+        """Active alerts, most severe first and newest first within a severity"""
+        
+        results = []
+        with self._lock:
+            for severity in SEVERITIES:
+                if severities is not None and severity not in severities:
+                    continue
+                for alert_id in reversed(self._active[severity]):
+                    results.append(self._alerts[alert_id])
+                    if limit is not None and len(results) >= limit:
+                        return results
+        return results
+    
+    def recent(self, severities=None, machine=None, limit=None):
+        """Most recent alerts (active or cleared), newest first"""
+        
+        results = []
+        with self._lock:
+            if machine is not None:
+                ids = reversed(self._by_machine.get(machine, {}))
+            else:
+                ids = reversed(self._alerts)
+            
+            for alert_id in ids:
+                alert = self._alerts[alert_id]
+                if severities is not None and alert['severity'] not in severities:
+                    continue
+                results.append(alert)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._alerts)
+
+
+class AlertHistoryStore:
+    """
+    Persistent alert history (SQLite) with secondary indexes for filtered range scans.
+    Dashboard sessions share one store per process, and only one engine at a time (the
+    writer) records live alerts into it, so each alert is stored once.
+    """
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    COLUMNS = ['timestamp', 'severity', 'rule', 'machine', 'line', 'sensor',
+               'metric', 'value', 'message', 'status', 'cleared_at']
+    
+    # Fixed-width text timestamps sort chronologically, so ranges map onto index scans
+    TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+    
+    # Columns a page can be ordered by: the index walked and its full key (the rowid
+    # included), so pages are read in index order and can seek past a cursor.
+    # Severity orders by rank rather than by name.
+    SORTABLE = {
+        'timestamp': ('idx_alerts_ts', ('ts', 'id')),
+        'severity': ('idx_alerts_rank_ts', ('severity_rank', 'ts', 'id')),
+        'machine': ('idx_alerts_machine_ts', ('machine', 'ts', 'severity', 'id')),
+        'line': ('idx_alerts_line_ts', ('line', 'ts', 'severity', 'id'))
+    }
+    
+    def __init__(self, path=None):
+        self.conn = connect('alerts.db', path)
+        self._lock = threading.Lock()
+        self._writer = None
+        
+        # Rows the current writer recorded and has not cleared yet
+        self._open_ids = set()
+        
+        # Bumped on every write, so cached views of the history know when to reload
+        self.version = 0
+        
+        with self._lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY,
+                    ts TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    rule TEXT,
+                    machine TEXT,
+                    line TEXT,
+                    sensor TEXT,
+                    metric TEXT,
+                    value REAL,
+                    message TEXT,
+                    status TEXT NOT NULL DEFAULT 'Active',
+                    cleared_at TEXT,
+                    severity_rank INTEGER
+                )
+            ''')
+            # Histories written before severities were ranked get the column filled in
+            if 'severity_rank' not in [row[1] for row in self.conn.execute('PRAGMA table_info(alerts)')]:
+                self.conn.execute('ALTER TABLE alerts ADD COLUMN severity_rank INTEGER')
+                self.conn.executemany(
+                    'UPDATE alerts SET severity_rank = ? WHERE severity = ?',
+                    [(rank, severity) for severity, rank in SEVERITY_RANK.items()]
+                )
+            # Trailing severity makes the machine/line indexes covering for severity counts
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_severity_ts ON alerts (severity, ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_machine_ts ON alerts (machine, ts, severity)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_line_ts ON alerts (line, ts, severity)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_rank_ts ON alerts (severity_rank, ts)')
+    
+    @classmethod
+    def shared(cls):
+        """The process-wide history every dashboard session reads"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def claim_writer(self, owner):
+        """
+        Whether ``owner`` records live alerts: the first engine to ask becomes the writer,
+        and the claim passes on once that engine has been garbage-collected. Rows the
+        previous writer left open can no longer be cleared by anyone, so they are closed
+        at the hand-off.
+        """
+        
+        with self._lock:
+            writer = self._writer() if self._writer is not None else None
+            if writer is None:
+                if self._open_ids:
+                    with self.conn:
+                        self.conn.executemany(
+                            "UPDATE alerts SET status = 'Cleared', cleared_at = ? WHERE id = ?",
+                            [(self._format_time(datetime.now()), history_id) for history_id in self._open_ids]
+                        )
+                    self._open_ids.clear()
+                    self.version += 1
+                self._writer = weakref.ref(owner)
+                return True
+            return writer is owner
+    
+    def _format_time(self, value):
+        return value.strftime(self.TIME_FORMAT) if value is not None else None
+    
+    def _row(self, alert):
+        return (
+            self._format_time(alert['timestamp']), alert['severity'], alert.get('rule'),
+            alert.get('machine'), alert.get('line'), alert.get('sensor'), alert.get('metric'),
+            alert.get('value'), alert.get('message'), alert.get('status', 'Active'),
+            self._format_time(alert.get('cleared_at')), SEVERITY_RANK.get(alert['severity'])
+        )
+    
+    def record(self, alerts):
+        """Append alerts in one transaction; returns their history ids"""
+        
+        ids = []
+        with self._lock, self.conn:
+            for alert in alerts:
+                cursor = self.conn.execute(
+                    'INSERT INTO alerts (ts, severity, rule, machine, line, sensor, metric, '
+                    'value, message, status, cleared_at, severity_rank) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    self._row(alert)
+                )
+                ids.append(cursor.lastrowid)
+                if alert.get('status', 'Active') == 'Active':
+                    self._open_ids.add(cursor.lastrowid)
+            self.version += bool(ids)
+        return ids
+    
+    def resolve(self, history_ids, timestamp=None):
+        """Mark recorded alerts as cleared"""
+        
+        if not history_ids:
+            return
+        cleared_at = self._format_time(timestamp or datetime.now())
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE alerts SET status = 'Cleared', cleared_at = ? WHERE id = ?",
+                [(cleared_at, history_id) for history_id in history_ids]
+            )
+            self._open_ids.difference_update(history_ids)
+            self.version += 1
+    
+    def _insert_frame(self, frame):
+        frame = frame.copy()
+        frame['timestamp'] = pd.to_datetime(frame['timestamp']).dt.strftime(self.TIME_FORMAT)
+        frame['cleared_at'] = pd.to_datetime(frame['cleared_at']).dt.strftime(self.TIME_FORMAT)
+        frame['severity_rank'] = frame['severity'].map(SEVERITY_RANK)
+        columns = self.COLUMNS + ['severity_rank']
+        rows = frame[columns].astype(object).where(frame[columns].notna(), None)
+        self.conn.executemany(
+            'INSERT INTO alerts (ts, severity, rule, machine, line, sensor, metric, '
+            'value, message, status, cleared_at, severity_rank) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            rows.itertuples(index=False, name=None)
+        )
+    
+    def bulk_load(self, frame):
+        """Insert a DataFrame of past alerts (``COLUMNS``) in a single transaction"""
+        
+        with self._lock, self.conn:
+            self._insert_frame(frame)
+            self.version += 1
+    
+    def seed(self, load):
+        """
+        Bulk-load the DataFrame ``load()`` returns, but only into an empty history. The
+        check and the insert share one write transaction, so sessions (or processes)
+        starting together seed it exactly once.
+        """
+        
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self.conn.execute('SELECT 1 FROM alerts LIMIT 1').fetchone() is None:
+                    self._insert_frame(load())
+                    self.version += 1
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+    
+    def _plan(self, severities, start, end, machines, lines):
+        """
+        Pick the index that drives the scan and build one range query per key value.
+        Each part is an equality on the leading index column plus a ``ts`` range, so
+        SQLite walks the index in timestamp order and stops after ``LIMIT`` rows.
+        """
+        
+        if machines:
+            key, values = 'machine', list(machines)
+        elif lines:
+            key, values = 'line', list(lines)
+        elif severities is not None:
+            key, values = 'severity', list(severities)
+        else:
+            key, values = None, [None]
+        
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('ts >= ?')
+            params.append(self._format_time(start))
+        if end is not None:
+            conditions.append('ts < ?')
+            params.append(self._format_time(end))
+        
+        # Remaining filters are checked against rows the driving index yields
+        for column, selected in (('severity', severities), ('line', lines)):
+            if selected is None or column == key or (column == 'line' and not selected):
+                continue
+            conditions.append(f"{column} IN ({', '.join('?' * len(selected))})")
+            params.extend(selected)
+        
+        parts = []
+        for value in values:
+            where = list(conditions)
+            part_params = list(params)
+            if key is not None:
+                where.insert(0, f'{key} = ?')
+                part_params.insert(0, value)
+            parts.append((' AND '.join(where) or '1', part_params))
+        return parts
+    
+    def query(self, severities=None, start=None, end=None, machines=None, lines=None, limit=500):
+        """
+        Alerts matching the filters, newest first, as a DataFrame.
+        ``start`` is inclusive and ``end`` exclusive; ``None`` leaves a filter open.
+        """
+        
+        if severities is not None and len(severities) == 0:
+            return pd.DataFrame(columns=['id'] + self.COLUMNS)
+        
+        frames = []
+        with self._lock:
+            for where, params in self._plan(severities, start, end, machines, lines):
+                frames.append(pd.read_sql_query(
+                    f'SELECT id, ts AS timestamp, severity, rule, machine, line, sensor, metric, '
+                    f'value, message, status, cleared_at FROM alerts WHERE {where} '
+                    f'ORDER BY ts DESC LIMIT ?',
+                    self.conn, params=params + [limit]
+                ))
+        
+        # Merge the per-key scans (each already sorted) and keep the newest rows overall
+        result = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        result = result.sort_values('timestamp', ascending=False, kind='mergesort').head(limit)
+        result['timestamp'] = pd.to_datetime(result['timestamp'], format=self.TIME_FORMAT)
+        result['cleared_at'] = pd.to_datetime(result['cleared_at'], format=self.TIME_FORMAT)
+        return result.reset_index(drop=True)
+    
+    def page(self, severities=None, start=None, end=None, offset=0, limit=50,
+             sort='timestamp', ascending=False, columns=None, after=None):
+        """
+        One page of matching alerts for server-side pagination, as ``(frame, cursor)``.
+        Sorting is limited to the ``SORTABLE`` columns (ties broken by the rest of their
+        index key), and only the requested columns are read. ``cursor`` marks the end of the page: passing it back
+        as ``after`` seeks straight to the following rows through the index, so ``offset``
+        only has to skip rows past that point rather than every row before the page.
+        """
+        
+        columns = [c for c in (columns or self.COLUMNS) if c in self.COLUMNS] or ['timestamp']
+        if severities is not None and len(severities) == 0:
+            return pd.DataFrame(columns=columns), None
+        
+        conditions, params = [], []
+        if severities is not None:
+            conditions.append(f"severity IN ({', '.join('?' * len(severities))})")
+            params.extend(severities)
+        if start is not None:
+            conditions.append('ts >= ?')
+            params.append(self._format_time(start))
+        if end is not None:
+            conditions.append('ts < ?')
+            params.append(self._format_time(end))
+        
+        # The index key is unique (it ends in the id), so the cursor is a row-value comparison
+        index, keys = self.SORTABLE.get(sort, self.SORTABLE['timestamp'])
+        if after is not None:
+            conditions.append(f"({', '.join(keys)}) {'>' if ascending else '<'} ({', '.join('?' * len(keys))})")
+            params.extend(after)
+        
+        direction = 'ASC' if ascending else 'DESC'
+        order = ', '.join(f'{key} {direction}' for key in keys)
+        select = ', '.join(['ts AS timestamp' if c == 'timestamp' else c for c in columns] +
+                           [f'{key} AS cursor_{i}' for i, key in enumerate(keys)])
+        
+        with self._lock:
+            result = pd.read_sql_query(
+                f"SELECT {select} FROM alerts INDEXED BY {index} "
+                f"WHERE {' AND '.join(conditions) or '1'} ORDER BY {order} LIMIT ? OFFSET ?",
+                self.conn, params=params + [limit, offset]
+            )
+        
+        cursor_columns = [f'cursor_{i}' for i in range(len(keys))]
+        cursor = tuple(result[column].tolist()[-1] for column in cursor_columns) if len(result) else None
+        result = result.drop(columns=cursor_columns)
+        for column in ('timestamp', 'cleared_at'):
+            if column in result:
+                result[column] = pd.to_datetime(result[column], format=self.TIME_FORMAT)
+        return result, cursor
+    
+    def count_by_severity(self, severities=None, start=None, end=None, machines=None, lines=None):
+        """Alert counts per severity for the filters (index-only scans)"""
+        
+        counts = {severity: 0 for severity in (severities if severities is not None else SEVERITIES)}
+        if not counts:
+            return counts
+        
+        with self._lock:
+            for where, params in self._plan(severities, start, end, machines, lines):
+                rows = self.conn.execute(
+                    f'SELECT severity, COUNT(*) FROM alerts WHERE {where} GROUP BY severity', params
+                ).fetchall()
+                for severity, count in rows:
+                    counts[severity] = counts.get(severity, 0) + count
+        return counts
+    
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM alerts').fetchone()[0]
+
+
+class AlertCorrelator:
+    """
+    Incremental alert-storm grouping. Alerts on the same line (or machine, when no line
+    is known) that follow each other within ``window_seconds`` collapse into one incident
+    whose root is the first alert. Open incidents are kept ordered by last activity, so
+    each batch only sweeps the incidents that have gone quiet since the previous one.
+    As with AlertStore, every public method holds the correlator's lock, since chatbot
+    and widget workers read incidents while the engine writes them.
+    """
+    
+    def __init__(self, window_seconds=120, max_incidents=2000):
+        self.window_seconds = window_seconds
+        self.max_incidents = max_incidents
+        self._incidents = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        
+        # Open incidents per group key, ordered by last alert time (oldest first)
+        self._open = {}
+        self._last_time = None
+    
+    def _group_key(self, alert):
+        return alert.get('line') or alert.get('machine')
+    
+    def add(self, alerts):
+        """Assign new alerts (in arrival order) to incidents; returns the touched incidents"""
+        
+        with self._lock:
+            touched = {}
+            for alert in sorted(alerts, key=lambda a: a['timestamp']):
+                now = alert['timestamp'].timestamp()
+                self._sweep(now)
+                
+                key = self._group_key(alert)
+                incident = self._open.pop(key, None)
+                if incident is None:
+                    incident = {
+                        'id': self._next_id,
+                        'key': key,
+                        'line': alert.get('line'),
+                        'root': alert,
+                        'severity': alert['severity'],
+                        'start': alert['timestamp'],
+                        'last': alert['timestamp'],
+                        'count': 0,
+                        'active': 0,
+                        'machines': {},
+                        'alert_ids': [],
+                        'status': 'Open'
+                    }
+                    self._incidents[incident['id']] = incident
+                    self._next_id += 1
+                
+                incident['count'] += 1
+                incident['active'] += alert.get('status', 'Active') == 'Active'
+                incident['last'] = alert['timestamp']
+                incident['machines'][alert.get('machine')] = incident['machines'].get(alert.get('machine'), 0) + 1
+                incident['alert_ids'].append(alert.get('id'))
+                if SEVERITIES.index(alert['severity']) < SEVERITIES.index(incident['severity']):
+                    incident['severity'] = alert['severity']
+                
+                # Re-inserting moves the incident to the end of the activity order
+                self._open[key] = incident
+                alert['incident_id'] = incident['id']
+                touched[incident['id']] = incident
+                self._last_time = now
+            
+            if len(self._incidents) > self.max_incidents:
+                self._evict()
+            
+            return list(touched.values())
+    
+    def resolve(self, alerts):
+        """Update active counts for alerts that have cleared"""
+        with self._lock:
+            for alert in alerts:
+                incident = self._incidents.get(alert.get('incident_id'))
+                if incident is not None and incident['active'] > 0:
+                    incident['active'] -= 1
+    
+    def _sweep(self, now):
+        """Close incidents whose last alert is older than the correlation window"""
+        
+        cutoff = now - self.window_seconds
+        while self._open:
+            key = next(iter(self._open))
+            incident = self._open[key]
+            if incident['last'].timestamp() >= cutoff:
+                break
+            incident['status'] = 'Closed'
+            del self._open[key]
+    
+    def _evict(self):
+        """Drop the oldest closed incidents that no longer hold active alerts"""
+        
+        excess = len(self._incidents) - self.max_incidents
+        for incident_id in list(self._incidents):
+            if excess <= 0:
+                break
+            incident = self._incidents[incident_id]
+            if incident['status'] == 'Open' or incident['active'] > 0:
+                continue
+            del self._incidents[incident_id]
+            excess -= 1
+    
+    def get(self, incident_id):
+        """Look up a single incident"""
+        with self._lock:
+            return self._incidents.get(incident_id)
+    
+    def active(self, severities=None, limit=None):
+        """Incidents with active alerts, most severe first and most recent first within a severity"""
+        
+        with self._lock:
+            incidents = [
+                incident for incident in self._incidents.values()
+                if incident['active'] > 0 and (severities is None or incident['severity'] in severities)
+            ]
+            incidents.sort(key=lambda i: (SEVERITIES.index(i['severity']), -i['last'].timestamp()))
+            return incidents[:limit] if limit is not None else incidents
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._incidents)
+
+
+class AlertEngine:
+    """Vectorized rule evaluation with hysteresis and deduplication windows"""
+    
+    def __init__(self, sensors, rules=None, store=None, history=None, correlator=None,
+                 dedup_seconds=300, ewma_alpha=0.1, warmup_ticks=10):
+        self.sensors = list(sensors)
+        self.rules = list(rules or DEFAULT_RULES)
+        self.store = store if store is not None else AlertStore()
+        self.history = history
+        self.correlator = correlator
+        self.ewma_alpha = ewma_alpha
+        self.warmup_ticks = warmup_ticks
+        
+        n_rules, n_sensors = len(self.rules), len(self.sensors)
+        self._sensor_index = {(s['machine'], s['metric']): i for i, s in enumerate(self.sensors)}
+        
+        # Rule parameters as (rules x 1) columns so every comparison broadcasts over sensors
+        metrics = np.array([s['metric'] for s in self.sensors])
+        self._applies = np.array([
+            np.ones(n_sensors, dtype=bool) if rule['metric'] == '*' else metrics == rule['metric']
+            for rule in self.rules
+        ]).reshape(n_rules, n_sensors)
+        sign = np.array([1.0 if rule.get('direction', 'above') == 'above' else -1.0 for rule in self.rules])
+        self._sign = sign[:, None]
+        self._limit = np.array([rule['limit'] for rule in self.rules], dtype=float)[:, None] * self._sign
+        self._clear = np.array([rule.get('clear', rule['limit']) for rule in self.rules], dtype=float)[:, None] * self._sign
+        self._dedup = np.array([rule.get('dedup_seconds', dedup_seconds) for rule in self.rules], dtype=float)[:, None]
+        self._rule_types = np.array([rule['type'] for rule in self.rules])
+        
+        # Per (rule, sensor) state
+        self._active = np.zeros((n_rules, n_sensors), dtype=bool)
+        self._last_fired = np.full((n_rules, n_sensors), -np.inf)
+        self._open_alerts = {}
+        
+        # Whether this engine has been recording into the shared history
+        self._recording = False
+        
+        # Per-sensor history for rate and anomaly rules
+        self._prev_values = None
+        self._prev_time = None
+        self._mean = None
+        self._var = None
+        self._ticks = 0
+    
+    def evaluate(self, values, timestamp=None):
+        """Evaluate every rule against one tick of sensor values; returns the new alerts"""
+        
+        timestamp = timestamp or datetime.now()
+        now = timestamp.timestamp()
+        values = np.asarray(values, dtype=float)
+        
+        # Derived signals per sensor (NaN never triggers or clears)
+        rate = np.full_like(values, np.nan)
+        if self._prev_values is not None and now > self._prev_time:
+            rate = (values - self._prev_values) / (now - self._prev_time)
+        
+        zscore = np.full_like(values, np.nan)
+        if self._ticks >= self.warmup_ticks:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                zscore = np.abs(values - self._mean) / np.sqrt(self._var)
+        
+        signals = np.empty(self._active.shape)
+        signals[self._rule_types == 'threshold'] = values
+        signals[self._rule_types == 'rate'] = rate
+        signals[self._rule_types == 'anomaly'] = zscore
+        signed = signals * self._sign
+        
+        # Hysteresis: trigger past 'limit' when inactive, clear past 'clear' when active
+        triggered = self._applies & ~self._active & (signed > self._limit)
+        cleared = self._active & (signed < self._clear)
+        
+        # Deduplication: a re-trigger inside the window re-arms silently
+        fire = triggered & (now - self._last_fired >= self._dedup)
+        
+        self._active |= triggered
+        self._active &= ~cleared
+        self._last_fired[fire] = now
+        
+        resolved = []
+        for rule_idx, sensor_idx in zip(*np.nonzero(cleared)):
+            alert_id = self._open_alerts.pop((rule_idx, sensor_idx), None)
+            if alert_id is not None:
+                self.store.resolve(alert_id, timestamp)
+                # The store's cap may already have evicted the alert
+                alert = self.store.get(alert_id)
+                if alert is not None:
+                    resolved.append(alert)
+        
+        new_alerts = []
+        for rule_idx, sensor_idx in zip(*np.nonzero(fire)):
+            rule = self.rules[rule_idx]
+            sensor = self.sensors[sensor_idx]
+            value = signals[rule_idx, sensor_idx]
+            alert = {
+                'timestamp': timestamp,
+                'severity': rule['severity'],
+                'rule': rule['name'],
+                'machine': sensor['machine'],
+                'line': sensor['line'],
+                'sensor': sensor['sensor'],
+                'metric': sensor['metric'],
+                'value': float(value),
+                'message': rule['message'].format(value=value, **sensor)
+            }
+            new_alerts.append(alert)
+        
+        # History writes are batched into one transaction per tick; engines of other
+        # sessions sharing the history leave the recording to its writer
+        if self.history is not None and self.history.claim_writer(self):
+            if not self._recording:
+                self._recording = True
+                self._record_open_alerts()
+            self.history.resolve([a['history_id'] for a in resolved if 'history_id' in a], timestamp)
+            for alert, history_id in zip(new_alerts, self.history.record(new_alerts)):
+                alert['history_id'] = history_id
+        
+        for k, (rule_idx, sensor_idx) in enumerate(zip(*np.nonzero(fire))):
+            alert_id = self.store.add(new_alerts[k])
+            self._open_alerts[(rule_idx, sensor_idx)] = alert_id
+            new_alerts[k] = self.store.get(alert_id)
+        
+        if self.correlator is not None:
+            self.correlator.resolve(resolved)
+            self.correlator.add(new_alerts)
+        
+        self._update_baseline(values)
+        self._prev_values = values
+        self._prev_time = now
+        
+        return new_alerts
+    
+    def evaluate_machine_status(self, machine_status, timestamp=None, vibration=None):
+        """
+        Evaluate one tick from ``generate_real_time_data``'s ``machine_status`` list.
+        ``vibration`` optionally overrides reported levels (same order as ``machine_status``).
+        """
+        
+        values = np.full(len(self.sensors), np.nan)
+        for k, entry in enumerate(machine_status):
+            for metric in ('temperature', 'vibration', 'pressure'):
+                i = self._sensor_index.get((entry['machine'], metric))
+                if i is None:
+                    continue
+                if metric == 'vibration' and vibration is not None:
+                    values[i] = vibration[k]
+                else:
+                    values[i] = entry.get(metric, np.nan)
+        
+        return self.evaluate(values, timestamp)
+    
+    def _record_open_alerts(self):
+        """Back-fill history for alerts raised before this engine became the writer"""
+        
+        pending = [alert for alert in map(self.store.get, self._open_alerts.values())
+                   if alert is not None and 'history_id' not in alert]
+        for alert, history_id in zip(pending, self.history.record(pending)):
+            alert['history_id'] = history_id
+    
+    def _update_baseline(self, values):
+        """Exponentially weighted mean/variance per sensor for the anomaly rule"""
+        
+        if self._mean is None:
+            self._mean = values.copy()
+            self._var = np.zeros_like(values)
+        else:
+            alpha = self.ewma_alpha
+            delta = values - self._mean
+            self._mean = self._mean + alpha * delta
+            self._var = (1 - alpha) * (self._var + alpha * delta ** 2)
+        self._ticks += 1
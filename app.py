@@ -16,9 +16,15 @@ warnings.filterwarnings('ignore')
 
 # Import custom modules
 from data_generator import SyntheticDataGenerator
-from ml_models import PredictiveMaintenanceModel, AnomalyDetector, EnergyForecaster, QualityPredictor
-from utils import format_metric, get_status_color, create_gauge_chart
-from ai_chatbot import ManufacturingChatbot
+from ml_models import PredictiveMaintenanceModel, AnomalyDetector, EnergyForecaster, QualityPredictor, IntentClassifier
+from utils import format_metric, get_status_color, create_gauge_chart, downsample_frame, CHART_WIDTHS
+from signal_processing import VibrationFeatureExtractor, averaged_spectrum, envelope_spectrum
+from alerting import AlertEngine, AlertHistoryStore, AlertCorrelator, build_machine_sensors
+from data_sources import TelemetryLog, build_live_data_sources
+from dashboard_builder import render_dashboard_builder, render_paginated_table
+from ai_chatbot import ManufacturingChatbot, ChatbotService
+from kpi_engine import KPIQueryEngine
+from retrieval import KnowledgeIndex
 
 # Page configuration
 st.set_page_config(
@@ -729,14 +735,60 @@ if 'energy_forecaster' not in st.session_state:
     st.session_state.energy_forecaster = EnergyForecaster()
 if 'quality_predictor' not in st.session_state:
     st.session_state.quality_predictor = QualityPredictor()
+if 'intent_classifier' not in st.session_state:
+    st.session_state.intent_classifier = IntentClassifier()
+if 'vibration_extractor' not in st.session_state:
+    st.session_state.vibration_extractor = VibrationFeatureExtractor(fs=2048, window=1024)
 if 'historical_data' not in st.session_state:
     st.session_state.historical_data = st.session_state.data_generator.generate_historical_data(days=30)
-if 'alerts' not in st.session_state:
-    st.session_state.alerts = []
+if 'machine_history' not in st.session_state:
+    # Per-machine hours and service dates seed the maintenance model's lifetime features
+    st.session_state.machine_history = st.session_state.data_generator.generate_machine_history(
+        st.session_state.historical_data
+    )
+    st.session_state.pm_model.feature_store.warm_start(
+        st.session_state.historical_data, st.session_state.machine_history
+    )
+if 'alert_history' not in st.session_state:
+    # One history per process, seeded with a 30-day backlog the first time it is empty
+    st.session_state.alert_history = AlertHistoryStore.shared()
+    st.session_state.alert_history.seed(
+        lambda: st.session_state.data_generator.generate_historical_alerts(days=30)
+    )
+if 'alert_engine' not in st.session_state:
+    st.session_state.alert_engine = AlertEngine(
+        build_machine_sensors(st.session_state.data_generator.machine_lines),
+        history=st.session_state.alert_history,
+        correlator=AlertCorrelator(window_seconds=120)
+    )
+if 'telemetry_log' not in st.session_state:
+    st.session_state.telemetry_log = TelemetryLog(st.session_state.data_generator.machine_lines)
+if 'live_data_sources' not in st.session_state:
+    st.session_state.live_data_sources = build_live_data_sources(
+        st.session_state.telemetry_log,
+        st.session_state.pm_model,
+        st.session_state.alert_history,
+        st.session_state.historical_data
+    )
+if 'knowledge_index' not in st.session_state:
+    # Picks up new or edited documents in knowledge/ without re-indexing the rest
+    st.session_state.knowledge_index = KnowledgeIndex()
+    st.session_state.knowledge_index.update()
+elif st.session_state.knowledge_index.stale:
+    # A search skipped a document edited or removed since it was indexed
+    st.session_state.knowledge_index.update()
 if 'chatbot' not in st.session_state:
-    st.session_state.chatbot = ManufacturingChatbot()
-if 'chat_messages' not in st.session_state:
-    st.session_state.chat_messages = []
+    # Chatbot answers are computed from the same live feeds the dashboard shows
+    st.session_state.chatbot = ManufacturingChatbot(kpi_engine=KPIQueryEngine(
+        st.session_state.historical_data,
+        st.session_state.pm_model,
+        st.session_state.alert_engine.store,
+        st.session_state.telemetry_log
+    ), retriever=st.session_state.knowledge_index, classifier=st.session_state.intent_classifier)
+if 'chat_service' not in st.session_state:
+    # Answers are computed on a worker pool shared by all sessions and streamed into the chat tab
+    st.session_state.chat_service = ChatbotService.shared()
+    st.session_state.chat_streams = []
 
 # Filter defaults
 if 'filter_lines' not in st.session_state:
@@ -748,6 +800,28 @@ if 'filter_shift' not in st.session_state:
 if 'filter_severity' not in st.session_state:
     st.session_state.filter_severity = ["Critical", "Warning", "Info"]
 
+# Generate current data (before alert banner and status bar)
+current_data = st.session_state.data_generator.generate_real_time_data()
+
+# Feed this tick's per-machine readings into the predictive maintenance feature store,
+# with vibration taken from condition-monitoring features over the raw machine waveforms
+machine_vibration = st.session_state.data_generator.generate_machine_vibration(current_data['machine_status'])
+machine_vibration_features = st.session_state.vibration_extractor.extract(machine_vibration)
+st.session_state.pm_model.update_features(
+    current_data['machine_status'],
+    vibration_features=machine_vibration_features
+)
+
+# Evaluate alert rules against this tick's readings
+st.session_state.alert_engine.evaluate_machine_status(
+    current_data['machine_status'],
+    vibration=machine_vibration_features['rms'][:, -1]
+)
+alert_store = st.session_state.alert_engine.store
+
+# Log the tick for the Dashboard Builder's live data sources
+st.session_state.telemetry_log.append(current_data)
+
 # Professional App Header
 current_time_display = datetime.now().strftime('%B %d, %Y | %H:%M:%S')
 user_name = st.session_state.user_info["name"] if st.session_state.user_info else "User"
@@ -800,7 +874,7 @@ st.markdown(f'''
 ''', unsafe_allow_html=True)
 
 # Alert Banner (if there are critical alerts)
-if len([a for a in st.session_state.get('alerts', []) if a.get('severity') == 'Critical']) > 0:
+if alert_store.count_active('Critical') > 0:
     st.markdown('''
     <div style="background: linear-gradient(90deg, #ff416c 0%, #ff4b2b 100%); padding: 12px 20px; border-radius: 10px; margin: 10px 0; display: flex; align-items: center; gap: 10px;">
         <span style="font-size: 1.5rem;">⚠️</span>
@@ -1034,9 +1108,6 @@ with st.sidebar:
         - Export chat history for records
         """)
 
-# Generate current data (before status bar)
-current_data = st.session_state.data_generator.generate_real_time_data()
-
 # Quick Status Bar - Above tabs
 st.markdown("---")
 status_col1, status_col2, status_col3, status_col4, status_col5 = st.columns(5)
@@ -1055,7 +1126,7 @@ with status_col1:
     ''', unsafe_allow_html=True)
 
 with status_col2:
-    active_alerts = len([a for a in st.session_state.alerts if a.get('severity') == 'Critical'])
+    active_alerts = alert_store.count_active('Critical')
     alert_color = "#ff6b6b" if active_alerts > 0 else "#64ffda"
     st.markdown(f'''
     <div class="kpi-card" style="text-align: center;">
@@ -1164,14 +1235,15 @@ with st.expander("🌍 Global Factory Network Overview", expanded=False):
 st.markdown("<br>", unsafe_allow_html=True)
 
 # Main Dashboard Tabs
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs([
     "📊 Real-Time Monitoring",
     "🔧 Predictive Maintenance", 
     "⚡ Energy Analytics",
     "✅ Quality Control",
     "📈 Production Analytics",
     "🤖 AI Insights",
-    "💬 AI Assistant"
+    "💬 AI Assistant",
+    "🛠️ Dashboard Builder"
 ])
 
 # Tab 1: Real-Time Monitoring
@@ -1283,7 +1355,10 @@ with tab1:
         # Generate vibration time series
         vib_df = st.session_state.data_generator.generate_vibration_stream(n_points=100)
         
-        fig_vib = px.line(vib_df, x='timestamp', y=['sensor_1', 'sensor_2', 'sensor_3'],
+        # Long streams are decimated to the chart's point budget before plotting
+        vib_plot = downsample_frame(vib_df, 'timestamp', ['sensor_1', 'sensor_2', 'sensor_3'],
+                                    width_px=CHART_WIDTHS['medium'])
+        fig_vib = px.line(vib_plot, x='timestamp', y=['sensor_1', 'sensor_2', 'sensor_3'],
                          title="Real-Time Vibration (mm/s)")
         fig_vib.update_layout(
             height=350,
@@ -1296,6 +1371,14 @@ with tab1:
                          annotation_text="Warning Threshold")
         
         st.plotly_chart(fig_vib, use_container_width=True)
+        
+        # Condition indicators over the latest window of each sensor
+        vib_indicators = VibrationFeatureExtractor(fs=1, window=30).latest(
+            vib_df[['sensor_1', 'sensor_2', 'sensor_3']].to_numpy().T,
+            channel_names=['Sensor 1', 'Sensor 2', 'Sensor 3']
+        )[['rms', 'peak', 'crest_factor', 'kurtosis']]
+        vib_indicators.columns = ['RMS', 'Peak', 'Crest Factor', 'Kurtosis']
+        st.dataframe(vib_indicators.round(2), use_container_width=True)
     
     # Pressure and Flow Monitoring
     col1, col2 = st.columns(2)
@@ -1303,12 +1386,14 @@ with tab1:
     with col1:
         st.markdown("#### 💨 Pressure Monitoring (PSI)")
         pressure_df = st.session_state.data_generator.generate_pressure_data()
+        pressure_plot = downsample_frame(pressure_df, 'timestamp', ['hydraulic', 'pneumatic', 'cooling'],
+                                         width_px=CHART_WIDTHS['medium'])
         
         fig_pressure = go.Figure()
         for col_name in ['hydraulic', 'pneumatic', 'cooling']:
             fig_pressure.add_trace(go.Scatter(
-                x=pressure_df['timestamp'],
-                y=pressure_df[col_name],
+                x=pressure_plot['timestamp'],
+                y=pressure_plot[col_name],
                 mode='lines+markers',
                 name=col_name.capitalize(),
                 fill='tozeroy',
@@ -1338,18 +1423,63 @@ with tab1:
     st.markdown("---")
     st.markdown("### ⚠️ Active Alerts & Notifications")
     
-    alerts = st.session_state.data_generator.generate_alerts()
-    
-    if alerts:
-        for alert in alerts[:5]:
-            if alert['severity'] == 'critical':
-                st.error(f"🔴 **CRITICAL** | {alert['timestamp']} | {alert['message']}")
-            elif alert['severity'] == 'warning':
-                st.warning(f"🟡 **WARNING** | {alert['timestamp']} | {alert['message']}")
+    # Related alerts are collapsed into incidents, each shown once under its root alert
+    incidents = st.session_state.alert_engine.correlator.active(severities=selected_severity)
+    
+    if incidents:
+        for incident in incidents[:5]:
+            root = incident['root']
+            incident_time = incident['start'].strftime('%H:%M:%S')
+            summary = root['message']
+            if incident['count'] > 1:
+                summary += (f" — **+{incident['count'] - 1} related** on {incident['line']} "
+                            f"({len(incident['machines'])} machines, {incident['active']} still active)")
+            if incident['severity'] == 'Critical':
+                st.error(f"🔴 **CRITICAL** | {incident_time} | {summary}")
+            elif incident['severity'] == 'Warning':
+                st.warning(f"🟡 **WARNING** | {incident_time} | {summary}")
             else:
-                st.info(f"🔵 **INFO** | {alert['timestamp']} | {alert['message']}")
+                st.info(f"🔵 **INFO** | {incident_time} | {summary}")
+        
+        total_active = sum(alert_store.count_active(severity) for severity in selected_severity)
+        st.caption(f"Showing {min(len(incidents), 5)} of {len(incidents)} incidents "
+                   f"({total_active} active alerts)")
     else:
         st.success("✅ No active alerts - All systems operating normally")
+    
+    # Alert History - severity and date filters resolve to indexed range scans
+    st.markdown("#### 📜 Alert History")
+    
+    history_dates = date_range if isinstance(date_range, (list, tuple)) else (date_range,)
+    history_start = datetime.combine(history_dates[0], datetime.min.time())
+    history_end = datetime.combine(history_dates[-1], datetime.min.time()) + timedelta(days=1)
+    
+    alert_history = st.session_state.alert_history
+    severity_counts = alert_history.count_by_severity(selected_severity, history_start, history_end)
+    history_total = sum(severity_counts.values())
+    
+    hist_cols = st.columns(3)
+    for col, severity in zip(hist_cols, ["Critical", "Warning", "Info"]):
+        col.metric(f"{severity} Alerts", f"{severity_counts.get(severity, 0):,}" if severity in selected_severity else "—")
+    
+    if history_total:
+        # Sorting and paging run in SQLite; only the visible page is materialized
+        render_paginated_table(
+            'alert_history',
+            history_total,
+            lambda offset, limit, sort, ascending, columns, after: alert_history.page(
+                selected_severity, history_start, history_end, offset=offset, limit=limit,
+                sort=sort, ascending=ascending, columns=columns, after=after
+            ),
+            ['timestamp', 'severity', 'machine', 'line', 'message', 'status', 'cleared_at'],
+            sort_columns=list(alert_history.SORTABLE),
+            page_size=50,
+            default_ascending=False,
+            context=(tuple(selected_severity), history_start, history_end)
+        )
+        st.caption(f"Alerts from {history_dates[0]} to {history_dates[-1]}")
+    else:
+        st.info("No alerts recorded for the selected severities and period")
 
 # Tab 2: Predictive Maintenance
 with tab2:
@@ -1427,6 +1557,9 @@ with tab2:
         st.markdown("#### 📉 Remaining Useful Life (RUL) Forecast")
         
         rul_data = st.session_state.pm_model.predict_rul()
+        rul_data = downsample_frame(rul_data, 'date',
+                                    ['rul_actual', 'rul_predicted', 'confidence_upper', 'confidence_lower'],
+                                    width_px=CHART_WIDTHS['medium'])
         
         fig_rul = go.Figure()
         
@@ -1502,6 +1635,100 @@ with tab2:
     )
     fig_schedule.update_layout(height=350, margin=dict(l=30, r=30, t=50, b=30))
     st.plotly_chart(fig_schedule, use_container_width=True)
+    
+    # High-Frequency Bearing Diagnostics
+    st.markdown("---")
+    st.markdown("#### 🔬 Bearing Diagnostics - Spectrum & Envelope Analysis")
+    
+    fault_options = {
+        "None": None,
+        "Outer Race (BPFO)": 'BPFO',
+        "Inner Race (BPFI)": 'BPFI',
+        "Rolling Element (BSF)": 'BSF'
+    }
+    
+    diag_col1, diag_col2, diag_col3, diag_col4 = st.columns(4)
+    with diag_col1:
+        diag_machine = st.selectbox("Machine", st.session_state.data_generator.machine_names, key="diag_machine")
+    with diag_col2:
+        diag_fs = st.selectbox("Sampling Rate (Hz)", [10000, 20000, 25000], index=1, key="diag_fs")
+    with diag_col3:
+        diag_duration = st.slider("Capture Length (s)", 1, 10, 5, key="diag_duration")
+    with diag_col4:
+        diag_fault = st.selectbox("Injected Fault", list(fault_options.keys()), key="diag_fault")
+    
+    # The capture and its spectra are only recomputed when the capture settings change
+    capture_key = (diag_machine, diag_fs, diag_duration, diag_fault)
+    if st.session_state.get('vibration_capture_key') != capture_key:
+        # The new capture reuses the session's scratch file, so release the old mapping first
+        st.session_state.pop('vibration_capture', None)
+        
+        capture = st.session_state.data_generator.generate_vibration_waveform(
+            diag_machine, duration=diag_duration, fs=diag_fs, fault=fault_options[diag_fault]
+        )
+        spec_freqs, spec_amp = averaged_spectrum(capture['signal'], capture['fs'])
+        env_freqs, env_amp = envelope_spectrum(capture['signal'], capture['fs'])
+        
+        st.session_state.vibration_capture = capture
+        st.session_state.vibration_spectra = {
+            'spectrum': (spec_freqs, spec_amp),
+            'envelope': (env_freqs, env_amp)
+        }
+        st.session_state.vibration_capture_key = capture_key
+    
+    capture = st.session_state.vibration_capture
+    spec_freqs, spec_amp = st.session_state.vibration_spectra['spectrum']
+    env_freqs, env_amp = st.session_state.vibration_spectra['envelope']
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        fig_spectrum = go.Figure(go.Scatter(
+            x=spec_freqs,
+            y=spec_amp,
+            mode='lines',
+            name='Spectrum',
+            line=dict(color='#667eea', width=1)
+        ))
+        fig_spectrum.update_layout(
+            title=f"FFT Spectrum ({capture['fs']:,} Hz, {capture['duration']} s)",
+            xaxis_title="Frequency (Hz)",
+            yaxis_title="Amplitude (g)",
+            yaxis_type="log",
+            height=350,
+            margin=dict(l=30, r=30, t=50, b=30)
+        )
+        st.plotly_chart(fig_spectrum, use_container_width=True)
+    
+    with col2:
+        env_mask = env_freqs <= 500
+        fig_envelope = go.Figure(go.Scatter(
+            x=env_freqs[env_mask],
+            y=env_amp[env_mask],
+            mode='lines',
+            name='Envelope',
+            line=dict(color='#ff6b6b', width=1)
+        ))
+        
+        # Mark the characteristic bearing defect frequencies
+        fault_colors = {'BPFO': '#ffbb33', 'BPFI': '#00C851', 'BSF': '#33b5e5', 'FTF': '#8892b0'}
+        for name, freq in capture['fault_frequencies'].items():
+            fig_envelope.add_vline(x=freq, line_dash="dot", line_color=fault_colors[name],
+                                   annotation_text=name, annotation_position="top")
+        
+        fig_envelope.update_layout(
+            title="Envelope Spectrum (Bearing Defect Frequencies)",
+            xaxis_title="Frequency (Hz)",
+            yaxis_title="Envelope Amplitude (g)",
+            height=350,
+            margin=dict(l=30, r=30, t=50, b=30)
+        )
+        st.plotly_chart(fig_envelope, use_container_width=True)
+    
+    st.caption(
+        f"Shaft speed: {capture['shaft_hz']:.1f} Hz | "
+        + " | ".join(f"{name}: {freq:.1f} Hz" for name, freq in capture['fault_frequencies'].items())
+    )
 
 # Tab 3: Energy Analytics
 with tab3:
@@ -1589,13 +1816,16 @@ with tab3:
     st.markdown("#### 🤖 AI Energy Consumption Forecast")
     
     forecast = st.session_state.energy_forecaster.predict_energy(days=7)
+    history_plot = downsample_frame(forecast.iloc[:24], 'date', ['actual'], width_px=CHART_WIDTHS['full'])
+    forecast_plot = downsample_frame(forecast.iloc[24:], 'date', ['predicted', 'upper', 'lower'],
+                                     width_px=CHART_WIDTHS['full'])
     
     fig_forecast = go.Figure()
     
     # Historical
     fig_forecast.add_trace(go.Scatter(
-        x=forecast['date'][:24],
-        y=forecast['actual'][:24],
+        x=history_plot['date'],
+        y=history_plot['actual'],
         mode='lines',
         name='Historical',
         line=dict(color='#667eea', width=2)
@@ -1603,8 +1833,8 @@ with tab3:
     
     # Forecast
     fig_forecast.add_trace(go.Scatter(
-        x=forecast['date'][24:],
-        y=forecast['predicted'][24:],
+        x=forecast_plot['date'],
+        y=forecast_plot['predicted'],
         mode='lines',
         name='AI Forecast',
         line=dict(color='#00C851', width=2, dash='dash')
@@ -1612,8 +1842,8 @@ with tab3:
     
     # Confidence interval
     fig_forecast.add_trace(go.Scatter(
-        x=list(forecast['date'][24:]) + list(forecast['date'][24:][::-1]),
-        y=list(forecast['upper'][24:]) + list(forecast['lower'][24:][::-1]),
+        x=list(forecast_plot['date']) + list(forecast_plot['date'][::-1]),
+        y=list(forecast_plot['upper']) + list(forecast_plot['lower'][::-1]),
         fill='toself',
         fillcolor='rgba(0, 200, 81, 0.2)',
         line=dict(color='rgba(255,255,255,0)'),
@@ -2242,6 +2472,19 @@ with tab7:
     </style>
     """, unsafe_allow_html=True)
     
+    def ask_chatbot(prompt):
+        st.session_state.chat_streams.append(
+            st.session_state.chat_service.submit(st.session_state.chatbot, prompt, current_data)
+        )
+    
+    # Answers that completed since the last run are already in the history
+    for stream in list(st.session_state.chat_streams):
+        stream.poll()
+        if stream.done:
+            st.session_state.chat_streams.remove(stream)
+            if stream.error is not None:
+                st.error(f"⚠️ Sorry, I couldn't answer '{stream.query}': {stream.error}")
+    
     # Quick action buttons
     st.markdown("#### 🚀 Quick Actions")
     quick_cols = st.columns(5)
@@ -2257,9 +2500,7 @@ with tab7:
     for i, (label, prompt) in enumerate(quick_prompts):
         with quick_cols[i]:
             if st.button(label, key=f"quick_{i}", use_container_width=True):
-                st.session_state.chat_messages.append({"role": "user", "content": prompt})
-                response = st.session_state.chatbot.get_response(prompt, current_data)
-                st.session_state.chat_messages.append({"role": "assistant", "content": response})
+                ask_chatbot(prompt)
                 st.rerun()
     
     st.markdown("---")
@@ -2267,32 +2508,52 @@ with tab7:
     # Chat history display with scroll
     st.markdown("#### 💬 Conversation")
     
-    if not st.session_state.chat_messages:
+    chat_history = st.session_state.chatbot.history
+    
+    if not len(chat_history) and not st.session_state.chat_streams:
         st.info("👋 Hello! I'm your AI manufacturing assistant. Ask me about OEE, energy, quality, production, maintenance, or any operational questions!")
     else:
-        # Create scrollable chat container
-        chat_html = '<div style="max-height: 400px; overflow-y: auto; padding: 10px; border: 1px solid #ddd; border-radius: 10px; background-color: #fafafa;">'
-        for idx, message in enumerate(st.session_state.chat_messages):
-            if message["role"] == "user":
-                chat_html += f'''
-                <div style="background-color: #e3f2fd; padding: 12px 15px; border-radius: 15px; margin: 8px 0; border-left: 4px solid #2196F3;">
-                    <strong>👤 You:</strong><br>{message["content"]}
-                </div>
-                '''
-            else:
-                chat_html += f'''
-                <div style="background-color: #f5f5f5; padding: 12px 15px; border-radius: 15px; margin: 8px 0; border-left: 4px solid #00C851;">
-                    <strong>🤖 AI Assistant:</strong><br>
-                </div>
-                '''
-        chat_html += '</div>'
-        st.markdown(chat_html, unsafe_allow_html=True)
-        
-        # Display assistant content separately for markdown rendering
-        for idx, message in enumerate(st.session_state.chat_messages):
-            if message["role"] == "assistant":
-                with st.expander(f"📝 Response {(idx//2)+1}", expanded=True):
-                    st.markdown(message["content"])
+        # Only the visible page of exchanges is fetched and rendered; page 1 is the latest
+        turns_per_page = 10
+        chat_pages = max(1, -(-len(chat_history) // turns_per_page))
+        # The selector reads its value from session state only, so clamping it is safe
+        if 'chat_page' not in st.session_state:
+            st.session_state.chat_page = 1
+        elif st.session_state.chat_page > chat_pages:
+            st.session_state.chat_page = chat_pages
+        chat_page = 1
+        if chat_pages > 1:
+            chat_page = st.number_input("Page (1 = latest)", min_value=1, max_value=chat_pages, step=1, key="chat_page")
+        
+        for turn in chat_history.page((int(chat_page) - 1) * turns_per_page, turns_per_page):
+            st.markdown(f'''
+            <div style="background-color: #e3f2fd; padding: 12px 15px; border-radius: 15px; margin: 8px 0; border-left: 4px solid #2196F3;">
+                <strong>👤 You:</strong><br>{turn["user"]}
+            </div>
+            ''', unsafe_allow_html=True)
+            with st.expander(f"🤖 AI Assistant · {turn['timestamp']}", expanded=True):
+                st.markdown(turn["assistant"])
+        
+        if chat_pages > 1:
+            st.caption(f"Page {int(chat_page)} of {chat_pages} · {len(chat_history)} exchanges")
+    
+    # Answers still being computed show what has arrived so far below the history; the
+    # run never waits for them, the rest arrives on later runs
+    for stream in list(st.session_state.chat_streams):
+        st.markdown(f'''
+        <div style="background-color: #e3f2fd; padding: 12px 15px; border-radius: 15px; margin: 8px 0; border-left: 4px solid #2196F3;">
+            <strong>👤 You:</strong><br>{stream.query}
+        </div>
+        ''', unsafe_allow_html=True)
+        with st.expander("🤖 AI Assistant · answering…", expanded=True):
+            placeholder = st.empty()
+            placeholder.markdown(stream.poll() + " ▌")
+            if stream.done:
+                st.session_state.chat_streams.remove(stream)
+                if stream.error is not None:
+                    placeholder.error(f"⚠️ Sorry, I couldn't answer that: {stream.error}")
+                else:
+                    placeholder.markdown(stream.text)
     
     st.markdown("---")
     
@@ -2305,7 +2566,6 @@ with tab7:
         st.session_state.clear_chat_requested = False
     
     if st.session_state.clear_chat_requested:
-        st.session_state.chat_messages = []
         st.session_state.chatbot.clear_history()
         st.session_state.chat_input_key += 1
         st.session_state.clear_chat_requested = False
@@ -2317,9 +2577,7 @@ with tab7:
     if st.session_state.send_message_requested:
         user_input = st.session_state.get(f"chat_input_{st.session_state.chat_input_key - 1}", "")
         if user_input.strip():
-            st.session_state.chat_messages.append({"role": "user", "content": user_input})
-            response = st.session_state.chatbot.get_response(user_input, current_data)
-            st.session_state.chat_messages.append({"role": "assistant", "content": response})
+            ask_chatbot(user_input)
         st.session_state.send_message_requested = False
     
     # Chat input
@@ -2336,9 +2594,7 @@ with tab7:
     with col2:
         if st.button("Send 📤", use_container_width=True):
             if user_input.strip():
-                st.session_state.chat_messages.append({"role": "user", "content": user_input})
-                response = st.session_state.chatbot.get_response(user_input, current_data)
-                st.session_state.chat_messages.append({"role": "assistant", "content": response})
+                ask_chatbot(user_input)
                 st.session_state.chat_input_key += 1
                 st.rerun()
     
@@ -2346,17 +2602,16 @@ with tab7:
     col1, col2, col3 = st.columns([1, 1, 2])
     with col1:
         if st.button("🗑️ Clear Chat", use_container_width=True):
-            st.session_state.chat_messages = []
             st.session_state.chatbot.clear_history()
             st.session_state.chat_input_key += 1
             st.rerun()
     
     with col2:
         # Export chat history
-        if st.session_state.chat_messages:
+        if len(chat_history):
             chat_export = "\n\n".join([
-                f"{'User' if m['role'] == 'user' else 'AI Assistant'}: {m['content']}"
-                for m in st.session_state.chat_messages
+                f"User: {turn['user']}\n\nAI Assistant: {turn['assistant']}"
+                for turn in chat_history.page(0, len(chat_history))
             ])
             st.download_button(
                 "📥 Export Chat",
@@ -2400,6 +2655,10 @@ with tab7:
         - What are the quick wins?
         """)
 
+# Tab 8: Dashboard Builder (widgets bound to the live data sources)
+with tab8:
+    render_dashboard_builder(data_sources=st.session_state.live_data_sources)
+
 # Professional Footer (only one footer at the bottom)
 st.markdown("""
 <div style="background: linear-gradient(135deg, #0f0c29 0%, #302b63 50%, #24243e 100%); padding: 30px; border-radius: 15px; margin-top: 30px;">
@@ -2444,4 +2703,9 @@ st.markdown("""
 if auto_refresh:
     time.sleep(refresh_rate)
     st.rerun()
+elif st.session_state.chat_streams or (
+        'builder_preparer' in st.session_state and st.session_state.builder_preparer.pending):
+    # Keep collecting chat answers still streaming in and dashboard widgets still loading
+    time.sleep(0.5)
+    st.rerun()
 
@@ -11,6 +11,18 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import hashlib
+import warnings
+import operator
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from collections import Counter, OrderedDict
+
+from dashboard_store import DashboardStore
+from data_sources import DataSourceRegistry
+from rolling_kernels import rolling_mean, rolling_sum, rolling_min, rolling_max, rolling_std, rolling_quantile
+from utils import CHART_WIDTHS, downsample_frame, sort_positions
 
 
 class WidgetLibrary:
@@ -177,54 +189,607 @@ class DashboardConfig:
         }
 
 
+class Aggregations:
+    """Vectorized aggregation layer behind the heatmap and statistics widgets"""
+    
+    # Candidate time-bucket sizes, smallest first
+    TIME_BUCKETS = ['1min', '5min', '15min', '30min', '1h', '3h', '6h', '12h', '1D', '7D']
+    
+    STATS = ['mean', 'min', 'max', 'std', 'median', 'last', 'count']
+    
+    @staticmethod
+    def bucket(values, max_buckets=48):
+        """Coarsen a high-cardinality axis: timestamps to a fixed bucket size, numbers to bins"""
+        
+        if pd.api.types.is_datetime64_any_dtype(values):
+            span = values.max() - values.min()
+            for freq in Aggregations.TIME_BUCKETS:
+                if span / pd.Timedelta(freq) <= max_buckets:
+                    return values.dt.floor(freq)
+            return values.dt.floor(Aggregations.TIME_BUCKETS[-1])
+        
+        if pd.api.types.is_numeric_dtype(values) and values.nunique() > max_buckets:
+            edges = np.linspace(values.min(), values.max(), max_buckets + 1)
+            bins = np.clip(np.searchsorted(edges, values.to_numpy(), side='right') - 1, 0, max_buckets - 1)
+            return pd.Series((edges[bins] + edges[bins + 1]) / 2, index=values.index)
+        
+        return values
+    
+    @staticmethod
+    def pivot(data, x_field, y_field, z_field, agg='mean', max_buckets=48):
+        """
+        Pivot table (y rows x x columns) of ``agg`` over ``z``, computed with flat bincounts.
+        Both axes are bucketed, so the grid is at most ``max_buckets`` on a side.
+        """
+        
+        x_codes, x_labels = pd.factorize(Aggregations.bucket(data[x_field], max_buckets), sort=True)
+        y_codes, y_labels = pd.factorize(Aggregations.bucket(data[y_field], max_buckets), sort=True)
+        values = pd.to_numeric(data[z_field], errors='coerce').to_numpy(dtype=float)
+        
+        valid = (x_codes >= 0) & (y_codes >= 0) & ~np.isnan(values)
+        flat = y_codes[valid] * len(x_labels) + x_codes[valid]
+        values = values[valid]
+        size = len(y_labels) * len(x_labels)
+        
+        counts = np.bincount(flat, minlength=size).astype(float)
+        if agg == 'count':
+            grid = counts
+        elif agg in ('min', 'max'):
+            grid = np.full(size, np.inf if agg == 'min' else -np.inf)
+            (np.minimum if agg == 'min' else np.maximum).at(grid, flat, values)
+            grid[counts == 0] = np.nan
+        else:
+            grid = np.bincount(flat, weights=values, minlength=size)
+            if agg == 'mean':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    grid = np.where(counts > 0, grid / counts, np.nan)
+        
+        return pd.DataFrame(grid.reshape(len(y_labels), len(x_labels)),
+                            index=pd.Index(y_labels, name=y_field),
+                            columns=pd.Index(x_labels, name=x_field))
+    
+    @staticmethod
+    def summary(data, fields, stats=None):
+        """Several statistics for several fields at once (fields x stats)"""
+        
+        stats = stats or ['mean', 'min', 'max', 'last']
+        values = data[fields].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        if len(values) == 0:
+            return pd.DataFrame(np.nan, index=fields, columns=stats)
+        
+        present = ~np.isnan(values)
+        counts = present.sum(axis=0)
+        
+        # Last non-missing value per column
+        last_row = np.where(present, np.arange(len(values))[:, None], -1).max(axis=0)
+        last = np.where(last_row >= 0, values[np.maximum(last_row, 0), np.arange(values.shape[1])], np.nan)
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            computed = {
+                'mean': lambda: np.nanmean(values, axis=0),
+                'min': lambda: np.nanmin(values, axis=0),
+                'max': lambda: np.nanmax(values, axis=0),
+                'std': lambda: np.nanstd(values, axis=0),
+                'median': lambda: np.nanmedian(values, axis=0),
+                'last': lambda: last,
+                'count': lambda: counts
+            }
+            return pd.DataFrame({stat: computed[stat]() for stat in stats if stat in computed}, index=fields)
+    
+    @staticmethod
+    def spec(widget_config, data):
+        """Aggregation a widget needs, as a hashable key (None if the frame cannot serve it)"""
+        
+        config = widget_config.get('config', {})
+        columns = list(data.columns)
+        if not columns:
+            return None
+        numeric = [c for c in columns if pd.api.types.is_numeric_dtype(data[c])]
+        categorical = [c for c in columns if c not in numeric and not pd.api.types.is_datetime64_any_dtype(data[c])]
+        
+        if widget_config.get('type') == 'heatmap':
+            x_field = config.get('x_field', 'timestamp' if 'timestamp' in columns else columns[0])
+            y_field = config.get('y_field', next((c for c in categorical if c != x_field), columns[-1]))
+            z_field = config.get('z_field', next((c for c in numeric if c not in (x_field, y_field)), columns[-1]))
+            return ('pivot', x_field, y_field, z_field, config.get('agg', 'mean'))
+        
+        fields = tuple(config.get('stats_list') or numeric[:3])
+        return ('summary', fields, tuple(config.get('stats', ['mean', 'min', 'max', 'last'])))
+    
+    @staticmethod
+    def compute(spec, data):
+        """Evaluate an aggregation spec against a frame"""
+        
+        if spec[0] == 'pivot':
+            _, x_field, y_field, z_field, agg = spec
+            if not {x_field, y_field, z_field} <= set(data.columns):
+                return None
+            return Aggregations.pivot(data, x_field, y_field, z_field, agg)
+        
+        _, fields, stats = spec
+        fields = [f for f in fields if f in data.columns]
+        return Aggregations.summary(data, fields, list(stats)) if fields else None
+
+
+class Transforms:
+    """
+    Declarative per-widget transforms and the planner that evaluates every transform
+    over a source in one shared pass. A widget's ``config['transform']`` reads e.g.::
+    
+        {'filter': [['line', '==', 'Line A'], ['efficiency', '>=', 80]],
+         'groupby': ['shift'], 'resample': '1h', 'time_field': 'timestamp',
+         'aggregate': {'units_produced': 'sum', 'efficiency': ['mean', 'max']},
+         'rolling': {'window': 3, 'func': 'mean'}}
+    
+    Steps run in that order: filter, then group (by columns and/or time bucket) with
+    the aggregates, then a rolling window over the result.
+    """
+    
+    OPERATORS = {
+        '==': operator.eq, '!=': operator.ne,
+        '>': operator.gt, '>=': operator.ge,
+        '<': operator.lt, '<=': operator.le,
+        'in': lambda values, options: values.isin(options)
+    }
+    AGGREGATES = ['mean', 'sum', 'min', 'max', 'median', 'std', 'count', 'first', 'last']
+    NUMERIC_AGGREGATES = {'mean', 'sum', 'median', 'std'}
+    ROLLING = ['mean', 'sum', 'min', 'max', 'median', 'std']
+    RESAMPLE = ['5min', '15min', '1h', '6h', '1D']
+    
+    @staticmethod
+    def _freeze(value):
+        return tuple(value) if isinstance(value, (list, tuple, set)) else value
+    
+    @staticmethod
+    def spec(widget_config):
+        """A widget's transform as a hashable spec (None when it renders the raw frame)"""
+        
+        config = widget_config.get('config', {})
+        transform = config.get('transform')
+        if not transform and widget_config.get('type') == 'pie_chart' \
+                and 'names_field' in config and 'values_field' in config:
+            # Pie slices are a grouped sum; planning it lets pies share the pass
+            transform = {'groupby': [config['names_field']], 'aggregate': {config['values_field']: 'sum'}}
+        if not transform:
+            return None
+        
+        filters = tuple(sorted(
+            (column, op, Transforms._freeze(value))
+            for column, op, value in transform.get('filter', [])
+            if op in Transforms.OPERATORS
+        ))
+        aggregate = tuple(sorted(
+            (column, func)
+            for column, funcs in transform.get('aggregate', {}).items()
+            for func in ([funcs] if isinstance(funcs, str) else funcs)
+            if func in Transforms.AGGREGATES
+        ))
+        resample = transform.get('resample') or None
+        keys = (
+            tuple(transform.get('groupby', [])),
+            transform.get('time_field', 'timestamp') if resample else None,
+            resample
+        ) if aggregate else None
+        
+        rolling = transform.get('rolling') or {}
+        rolling = (
+            int(rolling['window']),
+            rolling.get('func', 'mean') if rolling.get('func', 'mean') in Transforms.ROLLING else 'mean',
+            tuple(rolling.get('columns', ()))
+        ) if int(rolling.get('window', 0)) > 1 else None
+        
+        if not filters and keys is None and rolling is None:
+            return None
+        return (filters, keys, aggregate, rolling)
+    
+    @staticmethod
+    def execute(specs, frame):
+        """
+        Evaluate several specs over one frame, sharing every common step: each filter
+        condition is evaluated once, and all specs with the same filter and grouping
+        are answered by a single groupby carrying the union of their aggregates.
+        """
+        
+        conditions, filtered = {}, {}
+        
+        def apply_filter(filters):
+            if filters not in filtered:
+                mask = np.ones(len(frame), dtype=bool)
+                for condition in filters:
+                    if condition not in conditions:
+                        conditions[condition] = Transforms._condition(frame, condition)
+                    mask &= conditions[condition]
+                filtered[filters] = frame if mask.all() else frame[mask]
+            return filtered[filters]
+        
+        requested = {}
+        for filters, keys, aggregate, _ in specs:
+            if aggregate:
+                requested.setdefault((filters, keys), set()).update(aggregate)
+        grouped = {
+            (filters, keys): Transforms._aggregate(apply_filter(filters), keys, sorted(pairs))
+            for (filters, keys), pairs in requested.items()
+        }
+        
+        results = {}
+        for spec in specs:
+            filters, keys, aggregate, rolling = spec
+            if aggregate:
+                result = Transforms._project(grouped[(filters, keys)], aggregate)
+            else:
+                result = apply_filter(filters)
+            if rolling is not None:
+                result = Transforms._roll(result, keys[0] if keys else (), rolling)
+            results[spec] = result
+        return results
+    
+    @staticmethod
+    def _condition(frame, condition):
+        column, op, value = condition
+        if column not in frame.columns:
+            return np.zeros(len(frame), dtype=bool)
+        values = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            value = [pd.Timestamp(v) for v in value] if isinstance(value, tuple) else pd.Timestamp(value)
+        return np.asarray(Transforms.OPERATORS[op](values, list(value) if isinstance(value, tuple) else value),
+                          dtype=bool)
+    
+    @staticmethod
+    def _aggregate(data, keys, pairs):
+        """One groupby pass computing every (column, func) pair; output columns are ``column::func``"""
+        
+        groupby, time_field, resample = keys
+        named = {
+            f"{column}::{func}": (column, func)
+            for column, func in pairs
+            if column in data.columns
+            and (func not in Transforms.NUMERIC_AGGREGATES or pd.api.types.is_numeric_dtype(data[column]))
+        }
+        if not named:
+            # Nothing computable; an empty frame keeps the field names for the renderers
+            return data.iloc[:0]
+        
+        by = [column for column in groupby if column in data.columns]
+        if resample and time_field in data.columns and pd.api.types.is_datetime64_any_dtype(data[time_field]):
+            by.append(pd.Grouper(key=time_field, freq=resample))
+        if not by:
+            return data.groupby(np.zeros(len(data), dtype=int)).agg(**named).reset_index(drop=True)
+        return data.groupby(by, sort=True).agg(**named).reset_index()
+    
+    @staticmethod
+    def _project(grouped, aggregate):
+        """A spec's own columns out of a shared aggregate, renamed back to field names"""
+        
+        keys = [column for column in grouped.columns if '::' not in column]
+        per_column = Counter(column for column, _ in aggregate)
+        rename = {
+            f"{column}::{func}": column if per_column[column] == 1 and column not in keys else f"{column}_{func}"
+            for column, func in aggregate
+            if f"{column}::{func}" in grouped.columns
+        }
+        return grouped[keys + list(rename)].rename(columns=rename)
+    
+    @staticmethod
+    def _roll(data, groupby, rolling):
+        window, func, columns = rolling
+        columns = [
+            column for column in (columns or data.columns)
+            if column in data.columns and column not in groupby and pd.api.types.is_numeric_dtype(data[column])
+        ]
+        if not columns or data.empty:
+            return data
+        
+        # Shared results are read-only, so rolling writes into a copy
+        rolled = data.copy()
+        groups = [column for column in groupby if column in data.columns]
+        if groups:
+            rolled[columns] = data.groupby(groups)[columns].transform(
+                lambda values: values.rolling(window, min_periods=1).agg(func)
+            )
+        else:
+            # Every column rolls in one kernel call over a (columns x rows) matrix
+            values = data[columns].to_numpy(dtype=float, na_value=np.nan).T
+            rolled[columns] = Transforms._rolling_kernel(values, window, func).T
+        return rolled
+    
+    @staticmethod
+    def _rolling_kernel(values, window, func):
+        """Same results as pandas ``rolling(window, min_periods=1).agg(func)`` along each row"""
+        if func == 'median':
+            return rolling_quantile(values, window, 0.5, mode='same')
+        if func == 'std':
+            return rolling_std(values, window, ddof=1, mode='same')
+        kernels = {'mean': rolling_mean, 'sum': rolling_sum, 'min': rolling_min, 'max': rolling_max}
+        return kernels[func](values, window, mode='same')
+
+
+def sample_data_sources():
+    """Registry serving every data source from static sample data (no live feeds bound)"""
+    registry = DataSourceRegistry()
+    for data_source in WidgetLibrary.DATA_SOURCES:
+        registry.register(data_source, lambda source=data_source: WidgetRenderer.generate_sample_data(source))
+    return registry
+
+
+class DataSourceCache:
+    """
+    Materializes each data source at most once per version and shares the frame
+    across every widget bound to it. Frames are shared read-only: renderers must
+    derive new frames (groupby, head, ...) instead of modifying them in place.
+    Safe to use from several threads; each source is built under its own lock.
+    """
+    
+    # Widgets that render from their own config only
+    STATIC_WIDGETS = {'text_block', 'progress_bar'}
+    
+    # Widgets that render from an aggregate of their source rather than the raw frame
+    AGGREGATED_WIDGETS = {'heatmap', 'stat_card'}
+    
+    def __init__(self, registry=None, max_derived=256):
+        self.registry = registry if registry is not None else sample_data_sources()
+        self.max_derived = max_derived
+        self._frames = {}
+        self._derived = OrderedDict()
+        self._plans = {}
+        self._planned = {}
+        self._invalidations = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+    
+    def _source_lock(self, data_source):
+        # Widgets on one source wait for a single build; different sources build in parallel
+        with self._lock:
+            return self._locks.setdefault(data_source, threading.RLock())
+    
+    def version(self, data_source):
+        """Current version of a data source (published version plus local invalidations)"""
+        return (self._invalidations.get(data_source, 0), self.registry.version(data_source))
+    
+    def invalidate(self, data_source=None):
+        """Mark one source (or all sources) as changed so the next read rebuilds it"""
+        sources = [data_source] if data_source is not None else list(set(self._invalidations) | set(self._frames))
+        for source in sources:
+            self._invalidations[source] = self._invalidations.get(source, 0) + 1
+    
+    def stale_sources(self, data_sources):
+        """Sources whose cached frame is missing or older than their current version"""
+        return [
+            source for source in dict.fromkeys(data_sources)
+            if source not in self._frames or self._frames[source][0] != self.version(source)
+        ]
+    
+    def get(self, data_source):
+        """Return the frame for a source, rebuilding only if its version moved on"""
+        
+        with self._source_lock(data_source):
+            version = self.version(data_source)
+            cached = self._frames.get(data_source)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            
+            frame = self.registry.load(data_source)
+            self._frames[data_source] = (version, frame)
+            with self._lock:
+                self.builds += 1
+            return frame
+    
+    def derived(self, data_source, key, compute):
+        """
+        ``compute(frame)`` for a source, evaluated once per source version and shared by key.
+        At most ``max_derived`` results are kept, least recently used first out.
+        """
+        
+        with self._source_lock(data_source):
+            version = self.version(data_source)
+            with self._lock:
+                cached = self._derived.get((data_source, key))
+                if cached is not None and cached[0] == version:
+                    self._derived.move_to_end((data_source, key))
+                    return cached[1]
+            
+            result = compute(self.get(data_source))
+            with self._lock:
+                self._derived[(data_source, key)] = (version, result)
+                self._derived.move_to_end((data_source, key))
+                while len(self._derived) > self.max_derived:
+                    self._derived.popitem(last=False)
+            return result
+    
+    def plan(self, widgets):
+        """Register the transforms of the widgets about to render, grouped by source"""
+        plans = {}
+        for widget in widgets:
+            spec = Transforms.spec(widget)
+            if spec is not None:
+                plans.setdefault(widget.get('data_source', 'production'), set()).add(spec)
+        # Workers still running from the previous frame may be reading the old plans
+        with self._lock:
+            self._plans = plans
+    
+    def transformed(self, data_source, spec):
+        """
+        A widget's transformed frame. The first request after a version change runs
+        every planned transform on the source in one pass; the rest read its results.
+        """
+        
+        with self._source_lock(data_source):
+            version = self.version(data_source)
+            cached = self._planned.get(data_source)
+            if cached is None or cached[0] != version or spec not in cached[1]:
+                with self._lock:
+                    specs = self._plans.setdefault(data_source, set())
+                    specs.add(spec)
+                    specs = set(specs)
+                self._planned[data_source] = (version, Transforms.execute(specs, self.get(data_source)))
+            return self._planned[data_source][1][spec]
+
+
+class FigureCache:
+    """
+    LRU cache of built Plotly figures keyed by a stable hash of the widget config and
+    the version of its data source. Entries are bounded by their serialized (JSON) size.
+    Figures are built outside the lock, so widgets on different threads build in parallel.
+    """
+    
+    # Layout-only keys that do not change what a widget draws
+    IGNORED_KEYS = ('id', 'position')
+    
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def config_key(cls, widget_config):
+        """Stable hash of everything in a widget config that affects its figure"""
+        spec = {key: value for key, value in widget_config.items() if key not in cls.IGNORED_KEYS}
+        payload = json.dumps(spec, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def get_or_build(self, widget_config, data_version, build):
+        """Return the cached figure for this config and data version, building it on a miss"""
+        
+        key = (self.config_key(widget_config), data_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        fig = build()
+        if fig is None:
+            return None
+        
+        size = len(fig.to_json())
+        if size <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (fig, size)
+                    self.size_bytes += size
+                while self.size_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.size_bytes -= evicted_size
+        return fig
+    
+    def clear(self):
+        """Drop every cached figure"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+def render_paginated_table(key, total_rows, fetch, columns, sort_columns=None, page_size=25,
+                           default_sort=None, default_ascending=True, context=None):
+    """
+    Table with server-side pagination, sorting and column projection. ``fetch(offset,
+    limit, sort_column, ascending, columns, after)`` returns ``(rows, cursor)`` for just
+    the visible page, so only those rows are ever sent to the browser. Fetchers that
+    support keyset paging return a cursor for the end of the page; it comes back as
+    ``after`` (with ``offset`` counted from it) when a later page is read. Otherwise
+    ``cursor`` is None and ``offset`` counts from the first row. Cursors are dropped
+    when the ordering or ``context`` (the caller's filters) changes.
+    """
+    
+    sort_columns = sort_columns or columns
+    n_pages = max(1, -(-total_rows // page_size))
+    
+    # The page selector reads its value from session state only, so it can be kept in
+    # range when the row count shrinks without clashing with a widget default
+    page_key = f"{key}_page"
+    if page_key not in st.session_state:
+        st.session_state[page_key] = 1
+    elif st.session_state[page_key] > n_pages:
+        st.session_state[page_key] = n_pages
+    
+    col_columns, col_sort, col_order, col_page = st.columns([3, 2, 1, 1])
+    with col_columns:
+        shown = st.multiselect("Columns", columns, default=columns, key=f"{key}_columns")
+    with col_sort:
+        sort_index = sort_columns.index(default_sort) if default_sort in sort_columns else 0
+        sort_column = st.selectbox("Sort by", sort_columns, index=sort_index, key=f"{key}_sort")
+    with col_order:
+        order = st.selectbox("Order", ["Asc", "Desc"], index=0 if default_ascending else 1, key=f"{key}_order")
+    with col_page:
+        page = int(st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=page_key))
+    
+    # Seek from the end of the nearest page already read, skipping only the rows after it
+    ordering = (sort_column, order, context)
+    cursors_key = f"{key}_cursors"
+    if st.session_state.get(cursors_key, (None,))[0] != ordering:
+        st.session_state[cursors_key] = (ordering, {0: None})
+    cursors = st.session_state[cursors_key][1]
+    known = max(p for p in cursors if p < page)
+    
+    rows, cursor = fetch((page - 1 - known) * page_size, page_size, sort_column, order == "Asc",
+                         shown or columns, cursors[known])
+    if cursor is not None:
+        cursors[page] = cursor
+    
+    offset = (page - 1) * page_size
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    if total_rows:
+        st.caption(f"Rows {offset + 1:,}–{offset + len(rows):,} of {total_rows:,} · page {page} of {n_pages}")
+
+
 class WidgetRenderer:
     """Renders widgets based on configuration"""
     
     @staticmethod
-    def generate_sample_data(data_source, n=100):
+    def generate_sample_data(data_source, n=100, seed=42):
         """Generate sample data for preview"""
-        np.random.seed(42)
+        # Local generator: reproducible output without reseeding global NumPy state
+        rng = np.random.default_rng(seed)
         
         if data_source == "production":
             dates = pd.date_range(end=datetime.now(), periods=n, freq='H')
             return pd.DataFrame({
                 'timestamp': dates,
-                'units_produced': np.random.randint(150, 250, n),
+                'units_produced': rng.integers(150, 250, n),
                 'target': [200] * n,
-                'efficiency': np.random.uniform(75, 98, n),
-                'line': np.random.choice(['Line A', 'Line B', 'Line C', 'Line D'], n),
-                'shift': np.random.choice(['Morning', 'Afternoon', 'Night'], n)
+                'efficiency': rng.uniform(75, 98, n),
+                'line': rng.choice(['Line A', 'Line B', 'Line C', 'Line D'], n),
+                'shift': rng.choice(['Morning', 'Afternoon', 'Night'], n)
             })
         
         elif data_source == "quality":
             dates = pd.date_range(end=datetime.now(), periods=n, freq='H')
             return pd.DataFrame({
                 'timestamp': dates,
-                'defect_rate': np.random.uniform(0.5, 2.5, n),
-                'fpy': np.random.uniform(95, 99.5, n),
-                'rework_rate': np.random.uniform(0.2, 1.5, n),
-                'inspection_score': np.random.uniform(85, 100, n)
+                'defect_rate': rng.uniform(0.5, 2.5, n),
+                'fpy': rng.uniform(95, 99.5, n),
+                'rework_rate': rng.uniform(0.2, 1.5, n),
+                'inspection_score': rng.uniform(85, 100, n)
             })
         
         elif data_source == "energy":
             dates = pd.date_range(end=datetime.now(), periods=n, freq='H')
             return pd.DataFrame({
                 'timestamp': dates,
-                'consumption_kwh': np.random.uniform(1000, 2000, n),
-                'cost': np.random.uniform(100, 300, n),
-                'peak_demand': np.random.uniform(800, 1500, n),
-                'carbon_footprint': np.random.uniform(400, 800, n)
+                'consumption_kwh': rng.uniform(1000, 2000, n),
+                'cost': rng.uniform(100, 300, n),
+                'peak_demand': rng.uniform(800, 1500, n),
+                'carbon_footprint': rng.uniform(400, 800, n)
             })
         
         elif data_source == "equipment":
             machines = ['CNC-01', 'CNC-02', 'Robot-A', 'Robot-B', 'Press-01', 'Conveyor-01']
             return pd.DataFrame({
                 'machine_id': machines,
-                'status': np.random.choice(['Online', 'Maintenance', 'Idle'], len(machines)),
-                'health_score': np.random.uniform(70, 100, len(machines)),
-                'temperature': np.random.uniform(35, 85, len(machines)),
-                'vibration': np.random.uniform(0.1, 2.5, len(machines)),
-                'runtime': np.random.randint(100, 5000, len(machines))
+                'status': rng.choice(['Online', 'Maintenance', 'Idle'], len(machines)),
+                'health_score': rng.uniform(70, 100, len(machines)),
+                'temperature': rng.uniform(35, 85, len(machines)),
+                'vibration': rng.uniform(0.1, 2.5, len(machines)),
+                'runtime': rng.integers(100, 5000, len(machines))
             })
         
         elif data_source == "maintenance":
@@ -233,18 +798,18 @@ class WidgetRenderer:
                 'equipment': equipment,
                 'last_maintenance': pd.date_range(end=datetime.now(), periods=len(equipment), freq='W'),
                 'next_scheduled': pd.date_range(start=datetime.now(), periods=len(equipment), freq='W'),
-                'rul': np.random.randint(10, 100, len(equipment)),
-                'health_score': np.random.uniform(60, 100, len(equipment))
+                'rul': rng.integers(10, 100, len(equipment)),
+                'health_score': rng.uniform(60, 100, len(equipment))
             })
         
         elif data_source == "alerts":
             dates = pd.date_range(end=datetime.now(), periods=20, freq='30min')
             return pd.DataFrame({
                 'timestamp': dates,
-                'severity': np.random.choice(['Critical', 'Warning', 'Info'], 20),
-                'type': np.random.choice(['Temperature', 'Vibration', 'Production', 'Quality'], 20),
+                'severity': rng.choice(['Critical', 'Warning', 'Info'], 20),
+                'type': rng.choice(['Temperature', 'Vibration', 'Production', 'Quality'], 20),
                 'message': ['Alert message ' + str(i) for i in range(20)],
-                'status': np.random.choice(['Active', 'Acknowledged', 'Resolved'], 20)
+                'status': rng.choice(['Active', 'Acknowledged', 'Resolved'], 20)
             })
         
         return pd.DataFrame()
@@ -269,24 +834,43 @@ class WidgetRenderer:
                 st.metric(label=widget_config.get('title', 'Metric'), value=str(value))
     
     @staticmethod
-    def render_line_chart(widget_config, data):
-        """Render a line chart widget"""
+    def decimate(widget_config, data, x_field, y_fields, method='lttb'):
+        """Reduce long series to the point budget of the widget's rendered width"""
+        width = CHART_WIDTHS.get(widget_config.get('size', 'medium'), CHART_WIDTHS['medium'])
+        return downsample_frame(data, x_field, y_fields, method=method, width_px=width)
+    
+    @staticmethod
+    def show_figure(fig):
+        """Display a built figure (builders return None when fields are missing)"""
+        if fig is not None:
+            st.plotly_chart(fig, use_container_width=True)
+    
+    @staticmethod
+    def build_line_chart(widget_config, data):
+        """Build the figure for a line chart widget"""
         config = widget_config.get('config', {})
         x_field = config.get('x_field', 'timestamp')
         y_field = config.get('y_field', data.columns[1] if len(data.columns) > 1 else data.columns[0])
         
         if x_field in data.columns and y_field in data.columns:
-            fig = px.line(data, x=x_field, y=y_field, title=widget_config.get('title', 'Line Chart'))
+            plot_data = WidgetRenderer.decimate(widget_config, data, x_field, [y_field])
+            fig = px.line(plot_data, x=x_field, y=y_field, title=widget_config.get('title', 'Line Chart'))
             fig.update_layout(
                 height=300,
                 margin=dict(l=20, r=20, t=40, b=20),
                 template="plotly_dark"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            return fig
+        return None
     
     @staticmethod
-    def render_bar_chart(widget_config, data):
-        """Render a bar chart widget"""
+    def render_line_chart(widget_config, data):
+        """Render a line chart widget"""
+        WidgetRenderer.show_figure(WidgetRenderer.build_line_chart(widget_config, data))
+    
+    @staticmethod
+    def build_bar_chart(widget_config, data):
+        """Build the figure for a bar chart widget"""
         config = widget_config.get('config', {})
         x_field = config.get('x_field', data.columns[0])
         y_field = config.get('y_field', data.columns[1] if len(data.columns) > 1 else data.columns[0])
@@ -298,28 +882,42 @@ class WidgetRenderer:
                 margin=dict(l=20, r=20, t=40, b=20),
                 template="plotly_dark"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            return fig
+        return None
     
     @staticmethod
-    def render_pie_chart(widget_config, data):
-        """Render a pie chart widget"""
+    def render_bar_chart(widget_config, data):
+        """Render a bar chart widget"""
+        WidgetRenderer.show_figure(WidgetRenderer.build_bar_chart(widget_config, data))
+    
+    @staticmethod
+    def build_pie_chart(widget_config, data):
+        """Build the figure for a pie chart widget"""
         config = widget_config.get('config', {})
         values_field = config.get('values_field', data.columns[1] if len(data.columns) > 1 else data.columns[0])
         names_field = config.get('names_field', data.columns[0])
         
-        if values_field in data.columns and names_field in data.columns:
-            agg_data = data.groupby(names_field)[values_field].sum().reset_index()
+        if values_field in data.columns and names_field in data.columns \
+                and pd.api.types.is_numeric_dtype(data[values_field]):
+            # Planned pies arrive already grouped by their names field
+            agg_data = data if data[names_field].is_unique else data.groupby(names_field)[values_field].sum().reset_index()
             fig = px.pie(agg_data, values=values_field, names=names_field, title=widget_config.get('title', 'Pie Chart'))
             fig.update_layout(
                 height=300,
                 margin=dict(l=20, r=20, t=40, b=20),
                 template="plotly_dark"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            return fig
+        return None
     
     @staticmethod
-    def render_gauge(widget_config, data):
-        """Render a gauge widget"""
+    def render_pie_chart(widget_config, data):
+        """Render a pie chart widget"""
+        WidgetRenderer.show_figure(WidgetRenderer.build_pie_chart(widget_config, data))
+    
+    @staticmethod
+    def build_gauge(widget_config, data):
+        """Build the figure for a gauge widget"""
         config = widget_config.get('config', {})
         value = config.get('value', 75)
         min_val = config.get('min_val', 0)
@@ -349,48 +947,124 @@ class WidgetRenderer:
             }
         ))
         fig.update_layout(height=250, margin=dict(l=20, r=20, t=40, b=20), template="plotly_dark")
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
     
     @staticmethod
-    def render_area_chart(widget_config, data):
-        """Render an area chart widget"""
+    def render_gauge(widget_config, data):
+        """Render a gauge widget"""
+        WidgetRenderer.show_figure(WidgetRenderer.build_gauge(widget_config, data))
+    
+    @staticmethod
+    def build_area_chart(widget_config, data):
+        """Build the figure for an area chart widget"""
         config = widget_config.get('config', {})
         x_field = config.get('x_field', 'timestamp')
         y_field = config.get('y_field', data.columns[1] if len(data.columns) > 1 else data.columns[0])
         
         if x_field in data.columns and y_field in data.columns:
-            fig = px.area(data, x=x_field, y=y_field, title=widget_config.get('title', 'Area Chart'))
+            plot_data = WidgetRenderer.decimate(widget_config, data, x_field, [y_field])
+            fig = px.area(plot_data, x=x_field, y=y_field, title=widget_config.get('title', 'Area Chart'))
             fig.update_layout(
                 height=300,
                 margin=dict(l=20, r=20, t=40, b=20),
                 template="plotly_dark"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            return fig
+        return None
     
     @staticmethod
-    def render_scatter_plot(widget_config, data):
-        """Render a scatter plot widget"""
+    def render_area_chart(widget_config, data):
+        """Render an area chart widget"""
+        WidgetRenderer.show_figure(WidgetRenderer.build_area_chart(widget_config, data))
+    
+    @staticmethod
+    def build_scatter_plot(widget_config, data):
+        """Build the figure for a scatter plot widget"""
         config = widget_config.get('config', {})
         x_field = config.get('x_field', data.columns[0])
         y_field = config.get('y_field', data.columns[1] if len(data.columns) > 1 else data.columns[0])
         
         if x_field in data.columns and y_field in data.columns:
-            fig = px.scatter(data, x=x_field, y=y_field, title=widget_config.get('title', 'Scatter Plot'))
+            plot_data = WidgetRenderer.decimate(widget_config, data, x_field, [y_field], method='minmax')
+            fig = px.scatter(plot_data, x=x_field, y=y_field, title=widget_config.get('title', 'Scatter Plot'))
             fig.update_layout(
                 height=300,
                 margin=dict(l=20, r=20, t=40, b=20),
                 template="plotly_dark"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            return fig
+        return None
+    
+    @staticmethod
+    def render_scatter_plot(widget_config, data):
+        """Render a scatter plot widget"""
+        WidgetRenderer.show_figure(WidgetRenderer.build_scatter_plot(widget_config, data))
+    
+    @staticmethod
+    def build_heatmap(widget_config, pivot):
+        """Build the figure for a heatmap widget from its pivot table"""
+        if pivot is None or pivot.empty:
+            return None
+        
+        fig = go.Figure(go.Heatmap(
+            z=pivot.to_numpy(),
+            x=[str(label) for label in pivot.columns],
+            y=[str(label) for label in pivot.index],
+            colorscale='Viridis',
+            colorbar=dict(thickness=12)
+        ))
+        fig.update_layout(
+            title=widget_config.get('title', 'Heatmap'),
+            height=300,
+            margin=dict(l=20, r=20, t=40, b=20),
+            template="plotly_dark"
+        )
+        return fig
     
     @staticmethod
-    def render_data_table(widget_config, data):
-        """Render a data table widget"""
+    def render_heatmap(widget_config, pivot):
+        """Render a heatmap widget"""
+        WidgetRenderer.show_figure(WidgetRenderer.build_heatmap(widget_config, pivot))
+    
+    @staticmethod
+    def render_stat_card(widget_config, summary):
+        """Render a statistics card widget"""
+        st.markdown(f"**{widget_config.get('title', 'Statistics Card')}**")
+        if summary is None or summary.empty:
+            st.caption("No numeric fields to summarize")
+            return
+        
+        for field, row in summary.iterrows():
+            st.caption(field.replace('_', ' ').title())
+            cols = st.columns(len(row))
+            for col, (stat, value) in zip(cols, row.items()):
+                col.metric(stat.title(), "—" if pd.isna(value) else f"{value:,.1f}")
+    
+    @staticmethod
+    def render_data_table(widget_config, data, ordering=None):
+        """Render a data table widget, one page at a time"""
         config = widget_config.get('config', {})
         rows_to_show = config.get('rows_to_show', 10)
         
         st.markdown(f"**{widget_config.get('title', 'Data Table')}**")
-        st.dataframe(data.head(rows_to_show), use_container_width=True)
+        if data is None or data.empty:
+            st.caption("No rows to display")
+            return
+        
+        # ``ordering(column, ascending)`` returns row positions in sorted order
+        ordering = ordering or (lambda column, ascending: sort_positions(data, column, ascending))
+        
+        def fetch(offset, limit, sort_column, ascending, columns, after):
+            positions = ordering(sort_column, ascending)[offset:offset + limit]
+            return data.iloc[positions][columns], None
+        
+        render_paginated_table(
+            f"table_{widget_config.get('id', 'widget')}",
+            len(data),
+            fetch,
+            list(data.columns),
+            page_size=int(rows_to_show)
+        )
     
     @staticmethod
     def render_text_block(widget_config, data):
@@ -413,13 +1087,68 @@ class WidgetRenderer:
         st.caption(f"{value} / {max_value}")
     
     @staticmethod
-    def render_widget(widget_config):
-        """Main method to render any widget type"""
+    def prepare(widget_config, data_cache=None, figure_cache=None):
+        """
+        Load and build what a widget shows without calling Streamlit, so it can run on a
+        worker thread. Returns ('figure', fig) for cached charts, otherwise ('data', data).
+        """
         widget_type = widget_config.get('type')
         data_source = widget_config.get('data_source', 'production')
         
-        # Generate sample data
-        data = WidgetRenderer.generate_sample_data(data_source)
+        figure_builders = {
+            'line_chart': WidgetRenderer.build_line_chart,
+            'bar_chart': WidgetRenderer.build_bar_chart,
+            'pie_chart': WidgetRenderer.build_pie_chart,
+            'gauge': WidgetRenderer.build_gauge,
+            'area_chart': WidgetRenderer.build_area_chart,
+            'scatter_plot': WidgetRenderer.build_scatter_plot,
+            'heatmap': WidgetRenderer.build_heatmap,
+        }
+        
+        transform = Transforms.spec(widget_config)
+        
+        def load():
+            # Static widgets never read their source; the rest share one frame per source
+            if widget_type in DataSourceCache.STATIC_WIDGETS:
+                return None
+            frame = data_cache.get(data_source) if data_cache is not None else WidgetRenderer.generate_sample_data(data_source)
+            if widget_type not in DataSourceCache.AGGREGATED_WIDGETS:
+                # Declarative transforms run through the source's shared plan
+                if transform is None:
+                    return frame
+                if data_cache is None:
+                    return Transforms.execute([transform], frame)[transform]
+                return data_cache.transformed(data_source, transform)
+            
+            # Pivots and summaries are computed once per source version and shared by spec
+            spec = Aggregations.spec(widget_config, frame)
+            if spec is None:
+                return None
+            if data_cache is None:
+                return Aggregations.compute(spec, frame)
+            return data_cache.derived(data_source, spec, lambda source_frame: Aggregations.compute(spec, source_frame))
+        
+        # Charts reuse their prebuilt figure until the config or the source version changes
+        builder = figure_builders.get(widget_type)
+        if builder is not None and data_cache is not None and figure_cache is not None:
+            return ('figure', figure_cache.get_or_build(
+                widget_config,
+                data_cache.version(data_source),
+                lambda: builder(widget_config, load())
+            ))
+        
+        return ('data', load())
+    
+    @staticmethod
+    def display(widget_config, prepared, data_cache=None):
+        """Render a widget from the result of ``prepare``"""
+        kind, data = prepared
+        if kind == 'figure':
+            WidgetRenderer.show_figure(data)
+            return
+        
+        widget_type = widget_config.get('type')
+        data_source = widget_config.get('data_source', 'production')
         
         # Render based on widget type
         renderers = {
@@ -433,27 +1162,170 @@ class WidgetRenderer:
             'data_table': WidgetRenderer.render_data_table,
             'text_block': WidgetRenderer.render_text_block,
             'progress_bar': WidgetRenderer.render_progress_bar,
+            'heatmap': WidgetRenderer.render_heatmap,
+            'stat_card': WidgetRenderer.render_stat_card,
         }
         
         renderer = renderers.get(widget_type)
-        if renderer:
+        if widget_type == 'data_table' and data_cache is not None:
+            # Sort orderings are computed once per source version and reused across pages
+            WidgetRenderer.render_data_table(
+                widget_config, data,
+                ordering=lambda column, ascending: data_cache.derived(
+                    data_source, ('order', Transforms.spec(widget_config), column, ascending),
+                    lambda _: sort_positions(data, column, ascending)
+                )
+            )
+        elif renderer:
             renderer(widget_config, data)
         else:
             st.warning(f"Unknown widget type: {widget_type}")
+    
+    @staticmethod
+    def render_widget(widget_config, data_cache=None, figure_cache=None):
+        """Main method to render any widget type"""
+        prepared = WidgetRenderer.prepare(widget_config, data_cache, figure_cache)
+        WidgetRenderer.display(widget_config, prepared, data_cache)
 
 
-def render_dashboard_builder():
-    """Main dashboard builder interface"""
+class WidgetPreparer:
+    """
+    Prepares widget data and figures on a process-wide thread pool ahead of layout. Each
+    widget has a render budget; a widget that misses it gets a placeholder and the run
+    moves on. Work still running at the end of a run carries over to the next rerun,
+    which displays the result instead of starting over, so one slow source never stalls
+    the rest of the grid or the script itself. Until newer work finishes, a widget keeps
+    showing its last finished result.
+    """
+    
+    DEFAULT_BUDGET = 0.5  # seconds, overridable per widget with config['render_budget']
+    LATE_TIMEOUT = 30  # seconds a late widget may keep loading before it is reported stuck
+    MAX_WORKERS = 4
+    
+    _executor = None
+    _executor_lock = threading.Lock()
+    
+    def __init__(self):
+        self._pending = []
+        self._late = []
+        self._inflight = {}
+        self._results = {}
+        self.late_widgets = 0
+    
+    @classmethod
+    def executor(cls):
+        """The worker pool every session's preparer submits to"""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS, thread_name_prefix='widget-prepare')
+            return cls._executor
+    
+    def submit(self, widgets, data_cache, figure_cache):
+        """
+        Start preparing every widget; budgets count from now. Work carries over between
+        runs by widget config: if the source has moved on while the previous preparation
+        is still running, the widget waits for it instead of queueing another (work that
+        has not started yet is cancelled and resubmitted on the current data).
+        """
+        
+        start = time.monotonic()
+        inflight = {}
+        self._late = []
+        self._pending = []
+        for widget in widgets:
+            key = FigureCache.config_key(widget)
+            version = data_cache.version(widget.get('data_source', 'production'))
+            entry = inflight.get(key) or self._inflight.get(key)
+            if entry is not None and entry[0].done():
+                if entry[0].exception() is None:
+                    self._results[key] = entry[0].result()
+                if entry[2] != version:
+                    entry = None
+            elif entry is not None and entry[2] != version and entry[0].cancel():
+                entry = None
+            if entry is None:
+                future = self.executor().submit(WidgetRenderer.prepare, widget, data_cache, figure_cache)
+                entry = (future, start, version)
+            inflight[key] = entry
+            budget = float(widget.get('config', {}).get('render_budget', self.DEFAULT_BUDGET))
+            self._pending.append((key, entry[0], entry[1], start + budget))
+        self._inflight = inflight
+        self._results = {key: prepared for key, prepared in self._results.items() if key in inflight}
+    
+    def render(self, index, widget, data_cache):
+        """
+        Render widget ``index`` in the current layout slot; if it is late, its last finished
+        result or else a placeholder
+        """
+        
+        key, future, submitted, deadline = self._pending[index]
+        try:
+            prepared = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            prepared = self._results.get(key)
+        if prepared is None:
+            slot = st.empty()
+            if time.monotonic() - submitted > self.LATE_TIMEOUT:
+                slot.warning(f"⚠️ {widget.get('title', 'Widget')} is taking too long to load")
+            else:
+                slot.info(f"⏳ Loading {widget.get('title', 'widget')}...")
+                self._late.append((future, widget, slot))
+            return
+        WidgetRenderer.display(widget, prepared, data_cache)
+    
+    def finish(self, data_cache):
+        """
+        Fill the placeholders of late widgets that completed during layout, without
+        waiting for the rest; those are displayed by a later rerun (see ``pending``)
+        """
+        
+        late = []
+        for future, widget, slot in self._late:
+            if future.done():
+                with slot.container():
+                    WidgetRenderer.display(widget, future.result(), data_cache)
+            else:
+                late.append(future)
+        self.late_widgets = len(late)
+        self._pending, self._late = [], []
+    
+    @property
+    def pending(self):
+        """
+        Whether widgets with nothing to show yet are still loading, so the caller should
+        rerun to display them
+        """
+        
+        now = time.monotonic()
+        return any(
+            not future.done() and now - submitted <= self.LATE_TIMEOUT
+            for key, (future, submitted, _) in self._inflight.items() if key not in self._results
+        )
+
+
+def render_dashboard_builder(data_sources=None):
+    """
+    Main dashboard builder interface. ``data_sources`` is a DataSourceRegistry binding
+    the source names to live feeds; without one, widgets preview sample data.
+    """
     
     # Initialize dashboard state
-    if 'builder_dashboards' not in st.session_state:
-        st.session_state.builder_dashboards = {}
+    if 'dashboard_store' not in st.session_state:
+        st.session_state.dashboard_store = DashboardStore()
     if 'current_dashboard_id' not in st.session_state:
         st.session_state.current_dashboard_id = None
+    if 'current_dashboard_version' not in st.session_state:
+        st.session_state.current_dashboard_version = None
     if 'builder_widgets' not in st.session_state:
         st.session_state.builder_widgets = []
     if 'builder_mode' not in st.session_state:
         st.session_state.builder_mode = 'builder'  # 'builder' or 'preview'
+    if 'builder_data_cache' not in st.session_state:
+        st.session_state.builder_data_cache = DataSourceCache(data_sources)
+    if 'builder_figure_cache' not in st.session_state:
+        st.session_state.builder_figure_cache = FigureCache()
+    if 'builder_preparer' not in st.session_state:
+        st.session_state.builder_preparer = WidgetPreparer()
     
     # Header
     st.markdown("""
@@ -478,15 +1350,24 @@ def render_dashboard_builder():
     with col3:
         if st.button("💾 Save Dashboard", use_container_width=True):
             if st.session_state.builder_widgets:
-                dashboard_name = f"Dashboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                st.session_state.builder_dashboards[dashboard_name] = {
-                    'widgets': st.session_state.builder_widgets.copy(),
-                    'created': datetime.now().isoformat()
-                }
-                st.success(f"Dashboard saved as '{dashboard_name}'!")
+                # A loaded dashboard is saved as its next version, anything else as a new dashboard
+                dashboard_name = st.session_state.current_dashboard_id or f"Dashboard_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                try:
+                    version = st.session_state.dashboard_store.save(
+                        dashboard_name,
+                        st.session_state.builder_widgets,
+                        expected_version=st.session_state.current_dashboard_version
+                    )
+                    st.session_state.current_dashboard_id = dashboard_name
+                    st.session_state.current_dashboard_version = version
+                    st.success(f"Dashboard saved as '{dashboard_name}' (v{version})!")
+                except ValueError as e:
+                    st.error(f"{e}. Reload it before saving again.")
     with col4:
         if st.button("🗑️ Clear All", use_container_width=True):
             st.session_state.builder_widgets = []
+            st.session_state.current_dashboard_id = None
+            st.session_state.current_dashboard_version = None
             st.rerun()
     
     st.markdown("---")
@@ -495,6 +1376,9 @@ def render_dashboard_builder():
         render_builder_mode()
     else:
         render_preview_mode()
+    
+    st.markdown("---")
+    render_saved_dashboards()
 
 
 def render_builder_mode():
@@ -588,6 +1472,24 @@ def render_builder_mode():
                             y_field = st.selectbox("Y-Axis Field", ds_fields, key=f"y_{widget['id']}")
                             st.session_state.builder_widgets[idx]['config']['x_field'] = x_field
                             st.session_state.builder_widgets[idx]['config']['y_field'] = y_field
+                            
+                            # Optional transform: aggregate Y per X (or per time bucket), then smooth
+                            agg = st.selectbox("Aggregate Y", ['none'] + Transforms.AGGREGATES, key=f"tagg_{widget['id']}")
+                            resample = st.selectbox("Time Bucket", ['none'] + Transforms.RESAMPLE, key=f"tres_{widget['id']}")
+                            window = st.number_input("Rolling Window", min_value=0, max_value=50, value=0, key=f"troll_{widget['id']}")
+                            transform = {}
+                            if agg != 'none':
+                                transform['aggregate'] = {y_field: agg}
+                                if resample != 'none' and x_field == 'timestamp':
+                                    transform.update(resample=resample, time_field=x_field)
+                                else:
+                                    transform['groupby'] = [x_field]
+                            if window > 1:
+                                transform['rolling'] = {'window': int(window), 'func': 'mean', 'columns': [y_field]}
+                            if transform:
+                                st.session_state.builder_widgets[idx]['config']['transform'] = transform
+                            else:
+                                st.session_state.builder_widgets[idx]['config'].pop('transform', None)
                         
                         elif widget_type == 'metric_card':
                             value_field = st.selectbox("Value Field", ds_fields, key=f"val_{widget['id']}")
@@ -611,6 +1513,22 @@ def render_builder_mode():
                             content = st.text_area("Content (Markdown supported)", key=f"content_{widget['id']}")
                             st.session_state.builder_widgets[idx]['config']['content'] = content
                         
+                        elif widget_type == 'heatmap':
+                            x_field = st.selectbox("X-Axis Field", ds_fields, key=f"x_{widget['id']}")
+                            y_field = st.selectbox("Y-Axis Field", ds_fields, index=min(1, len(ds_fields) - 1), key=f"y_{widget['id']}")
+                            z_field = st.selectbox("Value Field", ds_fields, index=min(2, len(ds_fields) - 1), key=f"z_{widget['id']}")
+                            agg = st.selectbox("Aggregation", ['mean', 'sum', 'min', 'max', 'count'], key=f"agg_{widget['id']}")
+                            st.session_state.builder_widgets[idx]['config'].update(
+                                x_field=x_field, y_field=y_field, z_field=z_field, agg=agg
+                            )
+                        
+                        elif widget_type == 'stat_card':
+                            stats_fields = st.multiselect("Fields", ds_fields, key=f"stats_{widget['id']}")
+                            stats = st.multiselect("Statistics", Aggregations.STATS, default=['mean', 'min', 'max', 'last'],
+                                                   key=f"statlist_{widget['id']}")
+                            st.session_state.builder_widgets[idx]['config']['stats_list'] = stats_fields
+                            st.session_state.builder_widgets[idx]['config']['stats'] = stats
+                        
                         elif widget_type == 'data_table':
                             rows = st.number_input("Rows to display", min_value=5, max_value=50, value=10, key=f"rows_{widget['id']}")
                             st.session_state.builder_widgets[idx]['config']['rows_to_show'] = rows
@@ -632,6 +1550,22 @@ def render_preview_mode():
     
     # Group widgets by size for layout
     widgets = st.session_state.builder_widgets
+    data_cache = st.session_state.builder_data_cache
+    figure_cache = st.session_state.builder_figure_cache
+    
+    # Only widgets on sources that changed since the last frame rebuild their figures
+    data_widgets = [w for w in widgets if w.get('type') not in DataSourceCache.STATIC_WIDGETS]
+    changed = data_cache.stale_sources(w.get('data_source', 'production') for w in data_widgets)
+    refreshed = sum(1 for w in data_widgets if w.get('data_source', 'production') in changed)
+    
+    # Widgets sharing a source have their transforms evaluated together in one pass
+    data_cache.plan(data_widgets)
+    
+    # Data and figures are prepared concurrently; the layout below only displays them
+    preparer = st.session_state.builder_preparer
+    preparer.submit(widgets, data_cache, figure_cache)
+    st.caption(f"🔄 {refreshed} of {len(widgets)} widgets refreshed this frame"
+               + (f" (updated sources: {', '.join(changed)})" if changed else ""))
     
     # Create responsive layout
     i = 0
@@ -641,36 +1575,39 @@ def render_preview_mode():
         
         if size == 'full':
             with st.container():
-                WidgetRenderer.render_widget(widget)
+                preparer.render(i, widget, data_cache)
             i += 1
         elif size == 'large':
             col1, col2 = st.columns([2, 1])
             with col1:
-                WidgetRenderer.render_widget(widget)
+                preparer.render(i, widget, data_cache)
             i += 1
             if i < len(widgets) and widgets[i].get('size') == 'small':
                 with col2:
-                    WidgetRenderer.render_widget(widgets[i])
+                    preparer.render(i, widgets[i], data_cache)
                 i += 1
         elif size == 'medium':
             cols = st.columns(2)
             with cols[0]:
-                WidgetRenderer.render_widget(widget)
+                preparer.render(i, widget, data_cache)
             i += 1
             if i < len(widgets) and widgets[i].get('size') in ['medium', 'small']:
                 with cols[1]:
-                    WidgetRenderer.render_widget(widgets[i])
+                    preparer.render(i, widgets[i], data_cache)
                 i += 1
         else:  # small
             cols = st.columns(3)
             with cols[0]:
-                WidgetRenderer.render_widget(widget)
+                preparer.render(i, widget, data_cache)
             i += 1
             for j in range(1, 3):
                 if i < len(widgets) and widgets[i].get('size') == 'small':
                     with cols[j]:
-                        WidgetRenderer.render_widget(widgets[i])
+                        preparer.render(i, widgets[i], data_cache)
                     i += 1
+    
+    # Widgets that missed their budget fill their placeholders as they finish
+    preparer.finish(data_cache)
 
 
 def render_saved_dashboards():
@@ -678,22 +1615,57 @@ def render_saved_dashboards():
     
     st.markdown("### 💾 Saved Dashboards")
     
-    if not st.session_state.get('builder_dashboards'):
+    store = st.session_state.dashboard_store
+    
+    # Share dashboards between installations as JSON
+    uploaded = st.file_uploader("📤 Import dashboard (JSON)", type=["json"], key="dashboard_import")
+    if uploaded is not None and st.session_state.get('dashboard_import_done') != uploaded.file_id:
+        try:
+            name, version = store.import_json(uploaded.getvalue().decode('utf-8'))
+            st.session_state.dashboard_import_done = uploaded.file_id
+            st.success(f"Imported '{name}' (v{version})")
+        except ValueError as e:
+            st.error(f"Import failed: {e}")
+    
+    # Listing reads metadata only; widget lists are loaded when a dashboard is opened
+    dashboards = store.list_dashboards()
+    if not dashboards:
         st.info("No saved dashboards yet. Create and save a dashboard to see it here.")
         return
     
-    for name, dashboard in st.session_state.builder_dashboards.items():
+    for dashboard in dashboards:
+        name = dashboard['name']
         with st.expander(f"📊 {name}"):
             st.caption(f"Created: {dashboard['created']}")
-            st.caption(f"Widgets: {len(dashboard['widgets'])}")
+            st.caption(f"Updated: {dashboard['updated']} (v{dashboard['version']})")
+            st.caption(f"Widgets: {dashboard['widget_count']}")
             
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns(3)
             with col1:
                 if st.button("📂 Load", key=f"load_{name}"):
-                    st.session_state.builder_widgets = dashboard['widgets'].copy()
-                    st.session_state.builder_mode = 'preview'
+                    loaded = store.load(name)
+                    if loaded is not None:
+                        st.session_state.builder_widgets = loaded['widgets']
+                        st.session_state.current_dashboard_id = name
+                        st.session_state.current_dashboard_version = loaded['version']
+                        st.session_state.builder_mode = 'preview'
                     st.rerun()
             with col2:
+                if st.button("📥 Export", key=f"export_{name}"):
+                    st.session_state.dashboard_export = (name, store.export_json(name))
+                export = st.session_state.get('dashboard_export')
+                if export and export[0] == name and export[1]:
+                    st.download_button(
+                        "⬇️ Download JSON",
+                        data=export[1],
+                        file_name=f"{name}.json",
+                        mime="application/json",
+                        key=f"download_{name}"
+                    )
+            with col3:
                 if st.button("🗑️ Delete", key=f"delete_{name}"):
-                    del st.session_state.builder_dashboards[name]
+                    store.delete(name)
+                    if st.session_state.current_dashboard_id == name:
+                        st.session_state.current_dashboard_id = None
+                        st.session_state.current_dashboard_version = None
                     st.rerun()
@@ -0,0 +1,197 @@
+"""
+Dashboard Store for Smart Manufacturing Dashboard
+Persists Dashboard Builder layouts on local disk with versioned widget definitions
+"""
+
+import json
+import threading
+from datetime import datetime
+
+from storage import connect
+
+
+class DashboardStore:
+    """SQLite-backed dashboard repository shared by every dashboard session"""
+    
+    EXPORT_FORMAT = 'titanforge-dashboard'
+    EXPORT_VERSION = 1
+    
+    def __init__(self, path=None):
+        self.conn = connect('dashboards.db', path)
+        self._lock = threading.Lock()
+        
+        with self._lock, self.conn:
+            # Dashboard metadata only, so listing never touches widget definitions
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS dashboards (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    description TEXT NOT NULL DEFAULT '',
+                    version INTEGER NOT NULL,
+                    widget_count INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            # Every save appends a version; the primary key makes (dashboard, version) one lookup
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS dashboard_versions (
+                    dashboard_id INTEGER NOT NULL REFERENCES dashboards (id) ON DELETE CASCADE,
+                    version INTEGER NOT NULL,
+                    widgets TEXT NOT NULL,
+                    saved_at TEXT NOT NULL,
+                    PRIMARY KEY (dashboard_id, version)
+                ) WITHOUT ROWID
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_dashboards_updated ON dashboards (updated_at)')
+    
+    def save(self, name, widgets, description=None, expected_version=None):
+        """
+        Store a new version of a dashboard's widgets and return the version number.
+        With ``expected_version``, the save is rejected (ValueError) if someone else
+        saved the dashboard since that version was loaded.
+        """
+        
+        now = datetime.now().isoformat()
+        payload = json.dumps(widgets, default=str)
+        
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so the version check and the
+            # insert cannot interleave with a save from another session
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.conn.execute(
+                    'SELECT id, version, description FROM dashboards WHERE name = ?', (name,)
+                ).fetchone()
+                
+                if row is None:
+                    if expected_version is not None:
+                        raise ValueError(f"Dashboard '{name}' no longer exists")
+                    cursor = self.conn.execute(
+                        'INSERT INTO dashboards (name, description, version, widget_count, created_at, updated_at) '
+                        'VALUES (?, ?, 1, ?, ?, ?)',
+                        (name, description or '', len(widgets), now, now)
+                    )
+                    dashboard_id, version = cursor.lastrowid, 1
+                else:
+                    dashboard_id, current, current_description = row
+                    if expected_version is not None and expected_version != current:
+                        raise ValueError(
+                            f"Dashboard '{name}' was saved elsewhere (version {current}, loaded {expected_version})"
+                        )
+                    version = current + 1
+                    self.conn.execute(
+                        'UPDATE dashboards SET version = ?, widget_count = ?, description = ?, updated_at = ? '
+                        'WHERE id = ?',
+                        (version, len(widgets), description if description is not None else current_description,
+                         now, dashboard_id)
+                    )
+                
+                self.conn.execute(
+                    'INSERT INTO dashboard_versions (dashboard_id, version, widgets, saved_at) VALUES (?, ?, ?, ?)',
+                    (dashboard_id, version, payload, now)
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        
+        return version
+    
+    def load(self, name, version=None):
+        """Dashboard with its widget list (latest version unless ``version`` is given)"""
+        
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT d.name, d.description, v.version, d.version, v.widgets, d.created_at, v.saved_at '
+                'FROM dashboards d JOIN dashboard_versions v '
+                'ON v.dashboard_id = d.id AND v.version = COALESCE(?, d.version) '
+                'WHERE d.name = ?',
+                (version, name)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        name, description, version, latest, widgets, created_at, saved_at = row
+        return {
+            'name': name,
+            'description': description,
+            'version': version,
+            'latest_version': latest,
+            'widgets': json.loads(widgets),
+            'created': created_at,
+            'saved': saved_at
+        }
+    
+    def list_dashboards(self):
+        """Metadata for every dashboard, most recently updated first (widgets not loaded)"""
+        
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT name, description, version, widget_count, created_at, updated_at '
+                'FROM dashboards ORDER BY updated_at DESC'
+            ).fetchall()
+        
+        return [
+            {
+                'name': name, 'description': description, 'version': version,
+                'widget_count': widget_count, 'created': created_at, 'updated': updated_at
+            }
+            for name, description, version, widget_count, created_at, updated_at in rows
+        ]
+    
+    def versions(self, name):
+        """Saved versions of one dashboard, newest first"""
+        
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT v.version, v.saved_at FROM dashboard_versions v '
+                'JOIN dashboards d ON d.id = v.dashboard_id WHERE d.name = ? ORDER BY v.version DESC',
+                (name,)
+            ).fetchall()
+        return [{'version': version, 'saved': saved_at} for version, saved_at in rows]
+    
+    def delete(self, name):
+        """Remove a dashboard and all of its versions"""
+        
+        with self._lock, self.conn:
+            row = self.conn.execute('SELECT id FROM dashboards WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                return False
+            self.conn.execute('DELETE FROM dashboard_versions WHERE dashboard_id = ?', row)
+            self.conn.execute('DELETE FROM dashboards WHERE id = ?', row)
+        return True
+    
+    def export_json(self, name, version=None):
+        """Serialize a dashboard for sharing; None if it does not exist"""
+        
+        dashboard = self.load(name, version)
+        if dashboard is None:
+            return None
+        
+        return json.dumps({
+            'format': self.EXPORT_FORMAT,
+            'format_version': self.EXPORT_VERSION,
+            'name': dashboard['name'],
+            'description': dashboard['description'],
+            'exported_at': datetime.now().isoformat(),
+            'widgets': dashboard['widgets']
+        }, indent=2)
+    
+    def import_json(self, text, name=None):
+        """Save an exported dashboard (as a new version if the name exists); returns (name, version)"""
+        
+        document = json.loads(text)
+        if (not isinstance(document, dict) or document.get('format') != self.EXPORT_FORMAT
+                or not isinstance(document.get('widgets'), list)
+                or not all(isinstance(widget, dict) for widget in document['widgets'])):
+            raise ValueError("Not a dashboard export file")
+        
+        name = name or document.get('name') or f"Imported_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        version = self.save(name, document['widgets'], description=document.get('description'))
+        return name, version
+    
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM dashboards').fetchone()[0]
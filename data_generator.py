@@ -7,6 +7,20 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import random
+import os
+import tempfile
+import weakref
+
+from signal_processing import bearing_fault_frequencies
+from alerting import DEFAULT_RULES
+
+
+def _remove_file(path):
+    """Best-effort delete of a scratch file"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 
 class SyntheticDataGenerator:
@@ -15,6 +29,7 @@ class SyntheticDataGenerator:
     def __init__(self, seed=42):
         np.random.seed(seed)
         random.seed(seed)
+        self.seed = seed
         
         self.machine_names = [
             "CNC Machine #1", "CNC Machine #2", "CNC Machine #3",
@@ -26,6 +41,56 @@ class SyntheticDataGenerator:
             "Line A - Assembly", "Line B - Welding",
             "Line C - Painting", "Line D - Packaging"
         ]
+        
+        # Per-machine operating baselines so each machine has a consistent sensor signature.
+        # They come from their own generator, so the global seeded stream is left untouched
+        profile_rng = np.random.default_rng(seed)
+        self.machine_profiles = {
+            machine: {
+                'temperature': profile_rng.uniform(60, 78),
+                'vibration': profile_rng.uniform(3.0, 6.0),
+                'pressure': profile_rng.uniform(90, 115),
+                'shaft_hz': profile_rng.uniform(20, 60),
+                'utilization': profile_rng.uniform(0.6, 1.0),
+                'service_interval': int(profile_rng.integers(20, 60)),
+                'hour_meter': profile_rng.uniform(500, 3000)
+            }
+            for machine in self.machine_names
+        }
+        
+        # Production line each machine belongs to
+        self.machine_lines = {
+            "CNC Machine #1": "Line A - Assembly",
+            "CNC Machine #2": "Line A - Assembly",
+            "CNC Machine #3": "Line A - Assembly",
+            "Robot Arm A": "Line B - Welding",
+            "Welding Station": "Line B - Welding",
+            "Robot Arm B": "Line C - Painting",
+            "Press Machine": "Line C - Painting",
+            "Conveyor System": "Line D - Packaging",
+            "Packaging Unit": "Line D - Packaging"
+        }
+        
+        # Live machine state carried between ticks (status persistence and thermal inertia)
+        self.machine_state = {
+            machine: {'status': None, 'temperature': profile['temperature'], 'heat': 0.0}
+            for machine, profile in self.machine_profiles.items()
+        }
+        
+        # Scratch file behind vibration captures, created on first use
+        self._capture_path = None
+    
+    def _scratch_path(self):
+        """
+        One capture file per generator (i.e. per session): it is reused by every capture and
+        deleted when the generator is garbage collected or the process exits
+        """
+        
+        if self._capture_path is None:
+            handle, self._capture_path = tempfile.mkstemp(prefix='titanforge_vibration_', suffix='.f32')
+            os.close(handle)
+            weakref.finalize(self, _remove_file, self._capture_path)
+        return self._capture_path
     
     def generate_real_time_data(self):
         """Generate current real-time sensor readings"""
@@ -43,12 +108,31 @@ class SyntheticDataGenerator:
         statuses = ['Running', 'Running', 'Running', 'Idle', 'Maintenance', 'Standby']
         
         for machine in self.machine_names:
-            status = random.choice(statuses)
+            # Machines usually keep their status from one tick to the next
+            state = self.machine_state[machine]
+            if state['status'] is None or random.random() < 0.1:
+                state['status'] = random.choice(statuses)
+            status = state['status']
             efficiency = np.random.uniform(75, 98) if status == 'Running' else np.random.uniform(0, 30)
+            
+            # Per-machine sensor readings; machines that are not running cool down and settle
+            profile = self.machine_profiles[machine]
+            load = 1.0 if status == 'Running' else 0.3
+            
+            # Temperature follows its target with thermal lag; running machines occasionally overheat
+            if status == 'Running' and random.random() < 0.02:
+                state['heat'] += np.random.uniform(12, 22)
+            state['heat'] *= 0.9
+            target = 25 + (profile['temperature'] - 25) * load + state['heat']
+            state['temperature'] += (target - state['temperature']) * 0.3 + np.random.normal(0, 1)
+            
             machine_status.append({
                 'machine': machine,
                 'status': status,
-                'efficiency': efficiency
+                'efficiency': efficiency,
+                'temperature': state['temperature'],
+                'vibration': abs(np.random.normal(profile['vibration'] * load, 0.8 * load)),
+                'pressure': np.random.normal(profile['pressure'] * (0.5 + 0.5 * load), 8)
             })
         
         # Quality metrics
@@ -102,6 +186,71 @@ class SyntheticDataGenerator:
             'energy': [p * np.random.uniform(0.35, 0.45) for p in production]
         })
     
+    def generate_machine_history(self, historical_data):
+        """
+        Per-machine daily log over the historical window: hours run (the plant's daily
+        efficiency scaled by each machine's utilization), whether the machine was serviced
+        that day, and its hour meter at the end of the day
+        """
+        
+        rng = np.random.default_rng(self.seed + 1)
+        rows = []
+        for machine, profile in self.machine_profiles.items():
+            meter = profile['hour_meter']
+            interval = profile['service_interval']
+            phase = int(rng.integers(0, interval))
+            for i, (date, efficiency) in enumerate(zip(historical_data['date'], historical_data['efficiency'])):
+                serviced = (i + phase) % interval == 0
+                hours = 24 * min(max(efficiency, 0), 100) / 100 * profile['utilization'] * rng.normal(1, 0.05)
+                hours = max(0.0, hours - (8 if serviced else 0))
+                meter += hours
+                rows.append({
+                    'date': date,
+                    'machine': machine,
+                    'operating_hours': hours,
+                    'maintenance': serviced,
+                    'hour_meter': meter
+                })
+        return pd.DataFrame(rows)
+    
+    def generate_historical_alerts(self, days=30, alerts_per_day=150):
+        """Generate a backlog of past (cleared) alerts for the alert history store"""
+        
+        n = int(days * alerts_per_day)
+        rules = DEFAULT_RULES
+        
+        # Warnings dominate, critical alerts are rarer
+        severity_weight = {'Critical': 1.0, 'Warning': 4.0, 'Info': 2.0}
+        weights = np.array([severity_weight[rule['severity']] for rule in rules])
+        rule_idx = np.random.choice(len(rules), n, p=weights / weights.sum())
+        
+        end = pd.Timestamp(datetime.now())
+        timestamps = end - pd.to_timedelta(np.sort(np.random.uniform(0, days * 86400, n))[::-1], unit='s')
+        durations = pd.to_timedelta(np.random.exponential(600, n) + 30, unit='s')
+        
+        machines = np.random.choice(self.machine_names, n)
+        metrics = np.array([rules[i]['metric'] for i in rule_idx], dtype=object)
+        wildcard = metrics == '*'
+        metrics[wildcard] = np.random.choice(['temperature', 'vibration', 'pressure'], wildcard.sum())
+        
+        limits = np.array([rules[i]['limit'] for i in rule_idx], dtype=float)
+        values = limits + np.random.exponential(0.05, n) * np.abs(limits)
+        
+        rows = zip(rule_idx, machines, metrics, values)
+        return pd.DataFrame({
+            'timestamp': timestamps,
+            'severity': [rules[i]['severity'] for i in rule_idx],
+            'rule': [rules[i]['name'] for i in rule_idx],
+            'machine': machines,
+            'line': [self.machine_lines[m] for m in machines],
+            'sensor': [f"{m} / {metric}" for m, metric in zip(machines, metrics)],
+            'metric': metrics,
+            'value': values,
+            'message': [rules[i]['message'].format(machine=m, metric=metric, value=v) for i, m, metric, v in rows],
+            'status': 'Cleared',
+            'cleared_at': timestamps + durations
+        })
+    
     def generate_vibration_stream(self, n_points=100):
         """Generate real-time vibration sensor data"""
         
@@ -127,6 +276,103 @@ class SyntheticDataGenerator:
             'sensor_3': sensor_3
         })
     
+    def generate_machine_vibration(self, machine_status, fs=2048, duration=1.0):
+        """Generate one block of raw vibration waveforms per machine (machines x samples)"""
+        
+        n_samples = int(fs * duration)
+        t = np.arange(n_samples) / fs
+        
+        machines = [entry['machine'] for entry in machine_status]
+        shaft_hz = np.array([self.machine_profiles[m]['shaft_hz'] for m in machines])[:, None]
+        target_rms = np.array([entry.get('vibration', 1.0) for entry in machine_status])[:, None]
+        phase = np.random.uniform(0, 2 * np.pi, (len(machines), 2))
+        
+        # Shaft rotation fundamental plus 2x harmonic and broadband noise
+        waveform = (np.sin(2 * np.pi * shaft_hz * t + phase[:, :1])
+                    + 0.5 * np.sin(4 * np.pi * shaft_hz * t + phase[:, 1:])
+                    + np.random.normal(0, 0.3, (len(machines), n_samples)))
+        
+        # Scale each machine to the vibration level reported in its status
+        waveform *= target_rms / np.sqrt(np.mean(waveform ** 2, axis=1, keepdims=True))
+        
+        return waveform
+    
+    def generate_vibration_waveform(self, machine, duration=5.0, fs=20000, fault=None,
+                                    severity=1.0, chunk_seconds=1.0, path=None):
+        """
+        Synthesize a high-rate accelerometer capture for one machine into a memory-mapped buffer.
+        fault: None, 'BPFO' (outer race), 'BPFI' (inner race) or 'BSF' (rolling element).
+        path: backing file; defaults to the generator's scratch file, so a new capture
+        overwrites the previous one (drop references to the old signal first).
+        """
+        
+        n_samples = int(duration * fs)
+        shaft_hz = self.machine_profiles[machine]['shaft_hz']
+        fault_freqs = bearing_fault_frequencies(shaft_hz)
+        
+        if path is None:
+            path = self._scratch_path()
+        signal = np.memmap(path, dtype=np.float32, mode='w+', shape=(n_samples,))
+        
+        # Structural resonance rung by each defect impact (decaying sinusoid, ~8 ms long)
+        resonance_hz = min(3500.0, fs / 4)
+        kernel_t = np.arange(int(0.008 * fs)) / fs
+        kernel = np.exp(-900 * kernel_t) * np.sin(2 * np.pi * resonance_hz * kernel_t)
+        
+        # Impact times with slight slip jitter, as in real rolling-element bearings
+        impacts = np.array([])
+        if fault in fault_freqs:
+            period = 1 / fault_freqs[fault]
+            n_impacts = int(duration / period) + 1
+            impacts = np.arange(n_impacts) * period + np.random.normal(0, 0.01 * period, n_impacts)
+        
+        chunk = int(chunk_seconds * fs)
+        tail = np.zeros(len(kernel) - 1)
+        phase = np.random.uniform(0, 2 * np.pi, 3)
+        
+        # Generate in chunks so arbitrarily long captures never sit fully in RAM
+        for start in range(0, n_samples, chunk):
+            stop = min(start + chunk, n_samples)
+            t = np.arange(start, stop) / fs
+            
+            block = (0.8 * np.sin(2 * np.pi * shaft_hz * t + phase[0])
+                     + 0.3 * np.sin(4 * np.pi * shaft_hz * t + phase[1])
+                     + 0.15 * np.sin(2 * np.pi * 7.3 * shaft_hz * t + phase[2])
+                     + np.random.normal(0, 0.25, stop - start))
+            
+            if len(impacts):
+                pulses = np.zeros(stop - start)
+                in_chunk = impacts[(impacts >= start / fs) & (impacts < stop / fs)]
+                amplitude = np.full(len(in_chunk), 2.5 * severity)
+                if fault == 'BPFI':
+                    # Inner race defect rotates with the shaft, so impacts are load-modulated
+                    amplitude *= 0.6 + 0.4 * np.cos(2 * np.pi * shaft_hz * in_chunk)
+                # Rounding can push an impact just outside the chunk; keep it on the edge sample
+                offsets = np.clip((in_chunk * fs).astype(int) - start, 0, stop - start - 1)
+                np.add.at(pulses, offsets, amplitude)
+                
+                response = np.convolve(pulses, kernel)
+                response[:len(tail)] += tail
+                block += response[:stop - start]
+                tail = np.zeros(len(kernel) - 1)
+                overflow = response[stop - start:]
+                tail[:len(overflow)] = overflow
+            
+            signal[start:stop] = block
+        
+        signal.flush()
+        
+        return {
+            'signal': signal,
+            'path': path,
+            'fs': fs,
+            'duration': duration,
+            'machine': machine,
+            'shaft_hz': shaft_hz,
+            'fault': fault,
+            'fault_frequencies': fault_freqs
+        }
+    
     def generate_pressure_data(self, n_points=50):
         """Generate pressure sensor readings"""
         
@@ -140,28 +386,6 @@ class SyntheticDataGenerator:
             'cooling': np.random.normal(45, 3, n_points)
         })
     
-    def generate_alerts(self, n_alerts=8):
-        """Generate random alerts"""
-        
-        alert_templates = [
-            {"severity": "critical", "message": "Temperature threshold exceeded on CNC Machine #3"},
-            {"severity": "critical", "message": "Vibration anomaly detected on Robot Arm A"},
-            {"severity": "warning", "message": "Hydraulic pressure dropping on Press Machine"},
-            {"severity": "warning", "message": "Energy consumption above baseline on Line B"},
-            {"severity": "warning", "message": "Cycle time deviation detected on Assembly Line"},
-            {"severity": "info", "message": "Scheduled maintenance reminder for Conveyor System"},
-            {"severity": "info", "message": "Quality inspection completed for Batch #4521"},
-            {"severity": "info", "message": "Shift change completed - Line A now operating at full capacity"}
-        ]
-        
-        selected_alerts = random.sample(alert_templates, min(n_alerts, len(alert_templates)))
-        
-        now = datetime.now()
-        for i, alert in enumerate(selected_alerts):
-            alert['timestamp'] = (now - timedelta(minutes=random.randint(1, 60))).strftime('%H:%M:%S')
-        
-        return selected_alerts
-    
     def generate_energy_data(self):
         """Generate energy consumption metrics"""
         
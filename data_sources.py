@@ -0,0 +1,211 @@
+"""
+Live Data Sources for Smart Manufacturing Dashboard
+Binds the Dashboard Builder's data-source names to the live telemetry, models and stores
+"""
+
+import threading
+
+import pandas as pd
+import numpy as np
+from collections import deque
+from itertools import islice
+from datetime import datetime, timedelta
+
+
+class DataSourceRegistry:
+    """
+    Pluggable mapping from data-source names to loaders. Each source publishes a
+    version token that changes whenever its feed changes; sources registered
+    without one are treated as static.
+    """
+    
+    def __init__(self):
+        self._sources = {}
+    
+    def register(self, name, loader, version=None):
+        """Bind ``name`` to ``loader()`` (returns a DataFrame) and an optional ``version()``"""
+        self._sources[name] = (loader, version)
+    
+    def load(self, name):
+        """Materialize a source's current frame"""
+        entry = self._sources.get(name)
+        return entry[0]() if entry is not None else pd.DataFrame()
+    
+    def version(self, name):
+        """Current version token of a source"""
+        entry = self._sources.get(name)
+        if entry is None or entry[1] is None:
+            return 0
+        return entry[1]()
+    
+    def __contains__(self, name):
+        return name in self._sources
+    
+    def __iter__(self):
+        return iter(self._sources)
+
+
+class TelemetryLog:
+    """
+    Bounded log of live ticks, pre-flattened into rows for the time-series sources.
+    Appends and frame reads are locked, since chat workers read the log too.
+    """
+    
+    # Plant production rate is split evenly across lines before efficiency weighting
+    LINE_TARGET = 50
+    ENERGY_PRICE = 0.12  # $ per kWh
+    CARBON_INTENSITY = 0.4  # kg CO2 per kWh
+    
+    def __init__(self, machine_lines, maxlen=500):
+        self.machine_lines = machine_lines
+        self.lines = sorted(set(machine_lines.values()))
+        self.version = 0
+        self.latest = None
+        self._lock = threading.Lock()
+        
+        # (tick, version, logged at) of the latest ticks, so readers holding an older
+        # tick can still tell which version it was
+        self._recent = deque(maxlen=16)
+        
+        # Rows are appended once per tick, so loading a source never re-walks raw ticks
+        self._production = deque(maxlen=maxlen * len(self.lines))
+        self._quality = deque(maxlen=maxlen)
+        self._energy = deque(maxlen=maxlen)
+    
+    @staticmethod
+    def _shift(timestamp):
+        if 6 <= timestamp.hour < 14:
+            return 'Morning'
+        if 14 <= timestamp.hour < 22:
+            return 'Afternoon'
+        return 'Night'
+    
+    def append(self, current_data, timestamp=None):
+        """Record one tick from ``generate_real_time_data``"""
+        
+        with self._lock:
+            timestamp = timestamp or datetime.now()
+            shift = self._shift(timestamp)
+            
+            # Line efficiency is the mean efficiency of the line's machines this tick
+            line_efficiency = {line: [] for line in self.lines}
+            for entry in current_data['machine_status']:
+                line = self.machine_lines.get(entry['machine'])
+                if line is not None:
+                    line_efficiency[line].append(entry['efficiency'])
+            
+            rate_per_line = current_data['production_rate'] / len(self.lines)
+            for line in self.lines:
+                efficiency = float(np.mean(line_efficiency[line])) if line_efficiency[line] else 0.0
+                self._production.append({
+                    'timestamp': timestamp,
+                    'units_produced': round(rate_per_line * efficiency / 85),
+                    'target': self.LINE_TARGET,
+                    'efficiency': efficiency,
+                    'line': line,
+                    'shift': shift
+                })
+            
+            quality = current_data['quality_metrics']
+            self._quality.append({
+                'timestamp': timestamp,
+                'defect_rate': current_data['defect_rate'],
+                'fpy': quality['fpy'],
+                'rework_rate': quality['rework_rate'],
+                'inspection_score': quality['inspection_accuracy']
+            })
+            
+            consumption = current_data['energy_consumption']
+            recent = [row['consumption_kwh'] for row in islice(reversed(self._energy), 11)]
+            peak = max([consumption] + recent)
+            self._energy.append({
+                'timestamp': timestamp,
+                'consumption_kwh': consumption,
+                'cost': consumption * self.ENERGY_PRICE,
+                'peak_demand': peak,
+                'carbon_footprint': consumption * self.CARBON_INTENSITY
+            })
+            
+            self.latest = current_data
+            self.version += 1
+            self._recent.append((current_data, self.version, timestamp))
+    
+    def stamp(self, current_data):
+        """Version and log time of a recently appended tick (None if it is not in the log)"""
+        with self._lock:
+            for tick, version, timestamp in reversed(self._recent):
+                if tick is current_data:
+                    return version, timestamp
+        return None
+    
+    def production_frame(self):
+        with self._lock:
+            return pd.DataFrame(list(self._production))
+    
+    def quality_frame(self):
+        with self._lock:
+            return pd.DataFrame(list(self._quality))
+    
+    def energy_frame(self):
+        with self._lock:
+            return pd.DataFrame(list(self._energy))
+
+
+def build_live_data_sources(telemetry, pm_model, alert_history, historical_data=None):
+    """Registry binding every builder data source to the dashboard's live feeds"""
+    
+    registry = DataSourceRegistry()
+    
+    # Every telemetry-backed source gains a row or fresh readings on each tick, so the
+    # tick counter is their version; only the alert history changes independently
+    registry.register('production', telemetry.production_frame, lambda: telemetry.version)
+    registry.register('quality', telemetry.quality_frame, lambda: telemetry.version)
+    registry.register('energy', telemetry.energy_frame, lambda: telemetry.version)
+    
+    def equipment_frame():
+        status = telemetry.latest['machine_status'] if telemetry.latest else []
+        health = {h['equipment']: h['health_score'] for h in pm_model.predict_health_scores(historical_data)}
+        store = pm_model.feature_store
+        return pd.DataFrame([
+            {
+                'machine_id': entry['machine'],
+                'status': entry['status'],
+                'health_score': health.get(entry['machine']),
+                'temperature': entry['temperature'],
+                'vibration': entry['vibration'],
+                'runtime': store.get_features(entry['machine'])['operating_hours']
+            }
+            for entry in status
+        ])
+    
+    def maintenance_frame():
+        now = datetime.now()
+        store = pm_model.feature_store
+        rows = []
+        for h in pm_model.predict_health_scores(historical_data):
+            days_since = store.get_features(h['equipment'])['days_since_maintenance']
+            rows.append({
+                'equipment': h['equipment'],
+                'last_maintenance': now - timedelta(days=days_since),
+                'next_scheduled': now + timedelta(days=h['days_until_maintenance']),
+                'rul': h['days_until_maintenance'],
+                'health_score': h['health_score']
+            })
+        return pd.DataFrame(rows)
+    
+    registry.register('equipment', equipment_frame, lambda: telemetry.version)
+    registry.register('maintenance', maintenance_frame, lambda: telemetry.version)
+    
+    def alerts_frame():
+        history = alert_history.query(limit=200)
+        return pd.DataFrame({
+            'timestamp': history['timestamp'],
+            'severity': history['severity'],
+            'type': history['metric'].fillna('').str.title(),
+            'message': history['message'],
+            'status': history['status']
+        })
+    
+    registry.register('alerts', alerts_frame, lambda: alert_history.version)
+    
+    return registry
@@ -0,0 +1,218 @@
+"""
+Rolling-Window Feature Store for Smart Manufacturing Dashboard
+Maintains per-machine sensor aggregates that are updated incrementally on every tick
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+
+class MachineFeatureStore:
+    """Per-machine rolling-window aggregates over the live sensor streams"""
+    
+    # Order matches the feature columns the predictive maintenance model is trained on
+    MODEL_FEATURES = ['temperature_mean', 'vibration_rms', 'pressure_mean',
+                      'operating_hours', 'days_since_maintenance']
+    
+    # Nominal readings used before the first tick arrives
+    NOMINAL = {'temperature': 68.0, 'vibration': 4.5, 'pressure': 105.0}
+    
+    def __init__(self, machines, window=120):
+        self.machines = list(machines)
+        self.window = window
+        self._index = {machine: i for i, machine in enumerate(self.machines)}
+        
+        n = len(self.machines)
+        
+        # Ring buffers (machines x window), written one column per tick
+        self._temperature = np.zeros((n, window))
+        self._vibration_sq = np.zeros((n, window))
+        self._pressure = np.zeros((n, window))
+        self._pos = 0
+        self._count = 0
+        
+        # Running sums so each tick costs O(machines) regardless of window size
+        self._temp_sum = np.zeros(n)
+        self._temp_max = np.full(n, -np.inf)
+        self._vib_sq_sum = np.zeros(n)
+        self._pres_sum = np.zeros(n)
+        self._pres_sq_sum = np.zeros(n)
+        
+        # Lifetime counters
+        self.operating_hours = np.zeros(n)
+        self.last_maintenance = np.full(n, np.datetime64('NaT'), dtype='datetime64[s]')
+        self.last_update = None
+        self.is_warm = False
+        
+        # Precomputed outputs, refreshed at the end of every update
+        self._aggregates = {}
+        self._features = np.zeros((n, len(self.MODEL_FEATURES)))
+        self._refresh(datetime.now())
+    
+    def warm_start(self, historical_data, machine_history=None):
+        """
+        Seed operating hours and maintenance dates from history. With the per-machine
+        log (``generate_machine_history``), each machine gets its own hour meter and last
+        service date; otherwise every machine is credited the plant's running hours and
+        treated as unserviced since the start of the history window.
+        """
+        
+        n = len(self.machines)
+        if historical_data is not None and len(historical_data) > 0:
+            plant_hours = float((historical_data['efficiency'].clip(0, 100) / 100 * 24).sum())
+            history_start = np.datetime64(pd.Timestamp(historical_data['date'].min()).to_pydatetime(), 's')
+        else:
+            plant_hours = 0.0
+            history_start = np.datetime64(datetime.now(), 's')
+        
+        self.operating_hours = np.full(n, plant_hours)
+        self.last_maintenance = np.full(n, history_start, dtype='datetime64[s]')
+        
+        if machine_history is not None and len(machine_history) > 0:
+            latest = machine_history.sort_values('date').groupby('machine').last()
+            services = machine_history[machine_history['maintenance']].groupby('machine')['date'].max()
+            for machine, i in self._index.items():
+                if machine in latest.index:
+                    self.operating_hours[i] = latest.at[machine, 'hour_meter']
+                if machine in services.index:
+                    self.last_maintenance[i] = np.datetime64(pd.Timestamp(services[machine]).to_pydatetime(), 's')
+        
+        self.is_warm = True
+        self._refresh(self.last_update or datetime.now())
+    
+    def update(self, temperature, vibration, pressure, running, timestamp=None):
+        """Push one tick of readings (arrays ordered like ``machines``) into the windows"""
+        
+        timestamp = timestamp or datetime.now()
+        temperature = np.asarray(temperature, dtype=float)
+        vibration_sq = np.square(np.asarray(vibration, dtype=float))
+        pressure = np.asarray(pressure, dtype=float)
+        running = np.asarray(running, dtype=bool)
+        
+        pos = self._pos
+        full = self._count == self.window
+        
+        if full:
+            old_temp = self._temperature[:, pos].copy()
+            self._temp_sum -= old_temp
+            self._vib_sq_sum -= self._vibration_sq[:, pos]
+            self._pres_sum -= self._pressure[:, pos]
+            self._pres_sq_sum -= np.square(self._pressure[:, pos])
+        
+        self._temperature[:, pos] = temperature
+        self._vibration_sq[:, pos] = vibration_sq
+        self._pressure[:, pos] = pressure
+        
+        self._temp_sum += temperature
+        self._vib_sq_sum += vibration_sq
+        self._pres_sum += pressure
+        self._pres_sq_sum += np.square(pressure)
+        
+        # Max only needs a rescan for machines whose evicted reading was the max
+        stale = (old_temp >= self._temp_max) & (temperature < old_temp) if full else None
+        self._temp_max = np.maximum(self._temp_max, temperature)
+        if stale is not None and stale.any():
+            self._temp_max[stale] = self._temperature[stale].max(axis=1)
+        
+        self._pos = (pos + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+        
+        # Resync running sums once per full cycle to stop floating point drift
+        if full and self._pos == 0:
+            self._temp_sum = self._temperature.sum(axis=1)
+            self._vib_sq_sum = self._vibration_sq.sum(axis=1)
+            self._pres_sum = self._pressure.sum(axis=1)
+            self._pres_sq_sum = np.square(self._pressure).sum(axis=1)
+        
+        # Accumulate operating hours for machines that ran since the previous tick
+        if self.last_update is not None:
+            elapsed_hours = max((timestamp - self.last_update).total_seconds(), 0) / 3600
+            self.operating_hours += running * elapsed_hours
+        
+        self.last_update = timestamp
+        self._refresh(timestamp)
+    
+    def update_from_status(self, machine_status, timestamp=None, vibration=None):
+        """
+        Push one tick from the ``machine_status`` list of ``generate_real_time_data``.
+        ``vibration`` optionally overrides the reported levels with per-machine RMS values
+        computed from raw waveforms, in the same order as ``machine_status``.
+        """
+        
+        n = len(self.machines)
+        temperature = np.full(n, self.NOMINAL['temperature'])
+        pressure = np.full(n, self.NOMINAL['pressure'])
+        running = np.zeros(n, dtype=bool)
+        
+        levels = vibration
+        vibration = np.full(n, self.NOMINAL['vibration'])
+        
+        for k, entry in enumerate(machine_status):
+            i = self._index.get(entry['machine'])
+            if i is None:
+                continue
+            temperature[i] = entry.get('temperature', temperature[i])
+            vibration[i] = levels[k] if levels is not None else entry.get('vibration', vibration[i])
+            pressure[i] = entry.get('pressure', pressure[i])
+            running[i] = entry.get('status') == 'Running'
+        
+        self.update(temperature, vibration, pressure, running, timestamp)
+    
+    def record_maintenance(self, machine, timestamp=None):
+        """Reset the days-since-maintenance counter after a completed service"""
+        i = self._index[machine]
+        self.last_maintenance[i] = np.datetime64(timestamp or datetime.now(), 's')
+        self._refresh(self.last_update or datetime.now())
+    
+    def _refresh(self, timestamp):
+        """Recompute the derived aggregates from the running sums"""
+        
+        n = len(self.machines)
+        
+        if self._count > 0:
+            count = self._count
+            temp_mean = self._temp_sum / count
+            temp_max = self._temp_max.copy()
+            vib_rms = np.sqrt(np.maximum(self._vib_sq_sum / count, 0))
+            pres_mean = self._pres_sum / count
+            pres_var = np.maximum(self._pres_sq_sum / count - np.square(pres_mean), 0)
+        else:
+            temp_mean = np.full(n, self.NOMINAL['temperature'])
+            temp_max = temp_mean.copy()
+            vib_rms = np.full(n, self.NOMINAL['vibration'])
+            pres_mean = np.full(n, self.NOMINAL['pressure'])
+            pres_var = np.zeros(n)
+        
+        elapsed = np.datetime64(timestamp, 's') - self.last_maintenance
+        since = elapsed.astype(float) / 86400
+        days_since = np.where(np.isnat(elapsed), 0.0, np.maximum(since, 0))
+        
+        self._aggregates = {
+            'temperature_mean': temp_mean,
+            'temperature_max': temp_max,
+            'vibration_rms': vib_rms,
+            'pressure_mean': pres_mean,
+            'pressure_variance': pres_var,
+            'operating_hours': self.operating_hours.copy(),
+            'days_since_maintenance': days_since
+        }
+        self._features = np.column_stack([self._aggregates[name] for name in self.MODEL_FEATURES])
+    
+    def get_feature_matrix(self):
+        """Return the precomputed model feature matrix (machines x features)"""
+        return self._features
+    
+    def get_features(self, machine):
+        """Return the precomputed aggregates for a single machine"""
+        i = self._index[machine]
+        return {name: float(values[i]) for name, values in self._aggregates.items()}
+    
+    def to_frame(self):
+        """Return all aggregates as a DataFrame indexed by machine"""
+        return pd.DataFrame(self._aggregates, index=pd.Index(self.machines, name='machine'))
+    
+    @property
+    def samples(self):
+        """Number of ticks currently held in the rolling window"""
+        return self._count
@@ -3,14 +3,26 @@ Machine Learning Models for Smart Manufacturing Dashboard
 Includes Predictive Maintenance, Anomaly Detection, Energy Forecasting, and Quality Prediction
 """
 
+import os
+import re
+import time
+import zlib
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from scipy.sparse import csr_matrix
 from sklearn.ensemble import IsolationForest, RandomForestClassifier, GradientBoostingRegressor
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
 from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+from feature_store import MachineFeatureStore
+
+
+INTENT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge', 'intents.csv')
+
 
 class PredictiveMaintenanceModel:
     """AI model for predicting equipment maintenance needs"""
@@ -22,6 +34,7 @@ class PredictiveMaintenanceModel:
             "Welding Station", "Press Machine", "Packaging Unit"
         ]
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.feature_store = MachineFeatureStore(self.equipment_list)
         self._train_model()
     
     def _train_model(self):
@@ -44,26 +57,34 @@ class PredictiveMaintenanceModel:
         X_scaled = self.scaler.fit_transform(X)
         self.model.fit(X_scaled, y)
     
+    def update_features(self, machine_status, timestamp=None, vibration_features=None):
+        """
+        Feed the latest per-machine sensor readings into the rolling feature store.
+        ``vibration_features`` is the output of ``extract_vibration_features`` over the
+        machines' raw waveforms; its latest RMS replaces the reported vibration level.
+        """
+        vibration = None
+        if vibration_features is not None and vibration_features['rms'].shape[1] > 0:
+            vibration = vibration_features['rms'][:, -1]
+        self.feature_store.update_from_status(machine_status, timestamp, vibration)
+    
     def predict_health_scores(self, historical_data):
         """Predict health scores for each piece of equipment"""
         
+        # Operating hours and service dates are seeded from history once; after that
+        # the feature store keeps every aggregate current on each sensor tick
+        if not self.feature_store.is_warm:
+            self.feature_store.warm_start(historical_data)
+        
+        features = self.feature_store.get_feature_matrix()
+        features_scaled = self.scaler.transform(features)
+        
+        # Probability of needing maintenance, scored for all machines in one pass
+        maintenance_probs = self.model.predict_proba(features_scaled)[:, 1]
+        
         health_scores = []
         
-        for equipment in self.equipment_list:
-            # Simulate feature extraction from historical data
-            features = np.array([[
-                np.random.normal(68, 10),      # Temperature
-                np.random.normal(4.5, 1.5),    # Vibration
-                np.random.normal(105, 15),     # Pressure
-                np.random.uniform(100, 3000),  # Operating hours
-                np.random.uniform(5, 90),      # Days since maintenance
-            ]])
-            
-            features_scaled = self.scaler.transform(features)
-            
-            # Get probability of needing maintenance
-            maintenance_prob = self.model.predict_proba(features_scaled)[0][1]
-            
+        for equipment, maintenance_prob in zip(self.feature_store.machines, maintenance_probs):
             # Convert to health score (inverse of maintenance probability)
             health_score = (1 - maintenance_prob) * 100
             
@@ -401,3 +422,177 @@ class QualityPredictor:
             'defect_risk': defect_risk,
             'key_factors': key_factors
         }
+
+
+class IntentClassifier:
+    """
+    Chatbot intent model: hashed word and character n-grams feeding a multinomial
+    logistic regression, trained on the labeled query corpus in knowledge/intents.csv.
+    Character n-grams carry paraphrases and typos that share no keyword with a topic.
+    """
+    
+    N_FEATURES = 2 ** 12
+    CONFIDENCE_THRESHOLD = 0.4
+    
+    def __init__(self, corpus_path=INTENT_CORPUS, threshold=CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        if corpus_path is not None:
+            corpus = pd.read_csv(corpus_path)
+            self.fit(corpus['query'].tolist(), corpus['intent'].tolist())
+    
+    @classmethod
+    def _features(cls, query):
+        """Signed, hashed n-gram counts of a query as L2-normalized (indices, values)"""
+        
+        words = re.findall(r'[a-z0-9]+', query.lower())
+        grams = [f'w:{word}' for word in words]
+        grams += [f'b:{first} {second}' for first, second in zip(words, words[1:])]
+        for word in words:
+            padded = f' {word} '
+            grams += [f'c:{padded[i:i + n]}' for n in (3, 4) for i in range(len(padded) - n + 1)]
+        
+        # crc32 is stable across processes, unlike hash(); its top bit signs the feature
+        counts = {}
+        for gram in grams:
+            code = zlib.crc32(gram.encode())
+            index = code % cls.N_FEATURES
+            counts[index] = counts.get(index, 0.0) + (1.0 if code >> 31 else -1.0)
+        
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        norm = np.sqrt(np.dot(values, values))
+        return indices, values / norm if norm else values
+    
+    def fit(self, queries, labels):
+        """Train on labeled queries; returns self"""
+        
+        start = time.perf_counter()
+        rows, cols, data = [], [], []
+        for row, query in enumerate(queries):
+            indices, values = self._features(query)
+            rows.extend([row] * len(indices))
+            cols.extend(indices)
+            data.extend(values)
+        X = csr_matrix((data, (rows, cols)), shape=(len(queries), self.N_FEATURES))
+        
+        self.model = LogisticRegression(C=20.0, max_iter=1000)
+        self.model.fit(X, labels)
+        
+        # Weights are stored feature-major, so scoring a query gathers a few rows
+        # instead of going through sklearn's per-call validation
+        self.intents = [str(intent) for intent in self.model.classes_]
+        self._weights = np.ascontiguousarray(self.model.coef_.T)
+        self._bias = self.model.intercept_.copy()
+        self.training_seconds = time.perf_counter() - start
+        return self
+    
+    def predict_proba(self, query):
+        """Probability of every intent (in ``self.intents`` order) for one query"""
+        
+        indices, values = self._features(query)
+        scores = values @ self._weights[indices] + self._bias
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+    
+    def predict(self, query):
+        """(intent, confidence) for one query"""
+        
+        proba = self.predict_proba(query)
+        best = int(proba.argmax())
+        return self.intents[best], float(proba[best])
+    
+    def evaluate(self, queries, labels, fallback=None):
+        """
+        Score a labeled batch: accuracy, the share of queries above the confidence
+        threshold (coverage) and their accuracy, per-intent accuracy, misclassified
+        queries and p50/p99 latency in milliseconds. ``fallback(query)`` (e.g. the
+        keyword matcher) answers low-confidence queries for ``routed_accuracy``.
+        """
+        
+        return _intent_report(queries, labels, *self._predict_timed(queries, fallback), self.threshold)
+    
+    def _predict_timed(self, queries, fallback=None):
+        """Predictions, confidences, per-query latencies (ms) and, with a fallback, routed intents"""
+        
+        predictions, confidences, latencies = [], [], []
+        for query in queries:
+            start = time.perf_counter()
+            intent, confidence = self.predict(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            predictions.append(intent)
+            confidences.append(confidence)
+        
+        routed = None
+        if fallback is not None:
+            routed = [
+                predicted if confidence >= self.threshold else fallback(query)
+                for query, predicted, confidence in zip(queries, predictions, confidences)
+            ]
+        return predictions, confidences, latencies, routed
+
+
+def _intent_report(queries, labels, predictions, confidences, latencies, routed, threshold):
+    """Evaluation report over per-query predictions (see ``IntentClassifier.evaluate``)"""
+    
+    correct = np.array([predicted == label for predicted, label in zip(predictions, labels)])
+    confident = np.asarray(confidences) >= threshold
+    
+    report = {
+        'queries': len(labels),
+        'accuracy': float(correct.mean()),
+        'coverage': float(confident.mean()),
+        'confident_accuracy': float(correct[confident].mean()) if confident.any() else None,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'per_intent': {
+            intent: float(correct[[label == intent for label in labels]].mean()) for intent in sorted(set(labels))
+        },
+        'errors': [
+            {'query': query, 'intent': label, 'predicted': predicted, 'confidence': confidence}
+            for query, label, predicted, confidence, ok
+            in zip(queries, labels, predictions, confidences, correct) if not ok
+        ]
+    }
+    
+    if routed is not None:
+        report['routed_accuracy'] = float(np.mean([route == label for route, label in zip(routed, labels)]))
+    return report
+
+
+def evaluate_intent_classifier(corpus_path=INTENT_CORPUS, folds=5, threshold=IntentClassifier.CONFIDENCE_THRESHOLD,
+                               fallback=None, seed=42):
+    """
+    Stratified k-fold evaluation of IntentClassifier over a labeled query corpus
+    (CSV with ``query`` and ``intent`` columns). Each fold trains on the rest of the
+    corpus; the returned report is computed once over every held-out prediction and
+    adds the mean training time.
+    """
+    
+    corpus = pd.read_csv(corpus_path)
+    queries, labels = corpus['query'].tolist(), corpus['intent'].tolist()
+    
+    # Held-out queries and their predictions, concatenated over the folds
+    pooled = {'queries': [], 'labels': [], 'predictions': [], 'confidences': [], 'latencies': [], 'routed': []}
+    training_seconds = []
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    for train, test in splitter.split(queries, labels):
+        classifier = IntentClassifier(corpus_path=None, threshold=threshold)
+        classifier.fit([queries[i] for i in train], [labels[i] for i in train])
+        training_seconds.append(classifier.training_seconds)
+        
+        held_out = [queries[i] for i in test]
+        predictions, confidences, latencies, routed = classifier._predict_timed(held_out, fallback)
+        pooled['queries'].extend(held_out)
+        pooled['labels'].extend(labels[i] for i in test)
+        pooled['predictions'].extend(predictions)
+        pooled['confidences'].extend(confidences)
+        pooled['latencies'].extend(latencies)
+        pooled['routed'].extend(routed or [])
+    
+    report = _intent_report(
+        pooled['queries'], pooled['labels'], pooled['predictions'], pooled['confidences'],
+        pooled['latencies'], pooled['routed'] if fallback is not None else None, threshold
+    )
+    report['folds'] = folds
+    report['training_seconds'] = float(np.mean(training_seconds))
+    return report
@@ -0,0 +1,297 @@
+"""
+Knowledge Retrieval for Smart Manufacturing Dashboard
+BM25 passage search over the plant's maintenance manuals, SOPs and work orders
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+
+import numpy as np
+
+from storage import DATA_DIR
+
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge')
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i in is it its me my of on or
+our should that the their then there this to was we what when where which who why will with you
+""".split())
+
+MAX_TERM_LENGTH = 32
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in re.findall(r'[a-z0-9]+', text.lower())
+        if token not in STOPWORDS
+    ]
+
+
+class IndexSegment:
+    """
+    One immutable slice of the index, stored as .npy arrays and memory-mapped on open:
+    a sorted term array with posting offsets, the postings (passage, term frequency)
+    and per-passage length and location. Nothing is read until a query touches it.
+    """
+    
+    ARRAYS = ['terms', 'offsets', 'passages', 'frequencies', 'lengths', 'file_ids', 'starts', 'ends']
+    
+    def __init__(self, path):
+        self.path = path
+        for name in self.ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+    
+    def __len__(self):
+        return len(self.lengths)
+    
+    def postings(self, term):
+        """(passage ids, term frequencies) of a term, or None if the segment lacks it"""
+        i = int(np.searchsorted(self.terms, term))
+        if i >= len(self.terms) or self.terms[i] != term:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.passages[start:end], self.frequencies[start:end]
+    
+    @classmethod
+    def write(cls, path, passages):
+        """Build a segment from (file id, start, end, tokens) passages"""
+        
+        postings = {}
+        for passage_id, (_, _, _, tokens) in enumerate(passages):
+            for term, frequency in Counter(tokens).items():
+                postings.setdefault(term, []).append((passage_id, frequency))
+        
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        flat = [entry for term in terms for entry in postings[term]]
+        
+        arrays = {
+            'terms': np.array(terms, dtype=f'<U{MAX_TERM_LENGTH}'),
+            'offsets': offsets,
+            'passages': np.array([passage for passage, _ in flat], dtype=np.int32),
+            'frequencies': np.array([frequency for _, frequency in flat], dtype=np.float32),
+            'lengths': np.array([len(tokens) for _, _, _, tokens in passages], dtype=np.float32),
+            'file_ids': np.array([file_id for file_id, _, _, _ in passages], dtype=np.int32),
+            'starts': np.array([start for _, start, _, _ in passages], dtype=np.int64),
+            'ends': np.array([end for _, _, end, _ in passages], dtype=np.int64)
+        }
+        
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), array)
+        return cls(path)
+
+
+class IndexSnapshot:
+    """
+    One generation of the index: its manifest, open segments, live-passage masks and
+    BM25 corpus statistics. Built once and never modified, so a search that holds a
+    snapshot reads a consistent index while an update publishes the next one.
+    """
+    
+    def __init__(self, index_dir, manifest):
+        self.manifest = manifest
+        self.segments = [IndexSegment(os.path.join(index_dir, name)) for name in manifest['segments']]
+        
+        removed = np.array(manifest['removed'], dtype=np.int32)
+        self.live = [~np.isin(segment.file_ids, removed) for segment in self.segments]
+        self.n_passages = int(sum(live.sum() for live in self.live))
+        self.n_masked = sum(len(live) for live in self.live) - self.n_passages
+        total_length = sum(float(np.asarray(segment.lengths)[live].sum()) for segment, live in zip(self.segments, self.live))
+        self.avg_length = total_length / self.n_passages if self.n_passages else 0.0
+
+
+class KnowledgeIndex:
+    """
+    Incremental BM25 index over a folder of Markdown/text documents. Each ``update``
+    indexes only new or changed files into a new memory-mapped segment; passages of
+    changed or removed files are masked out. Passage text stays in the source files
+    and is read back only for the hits that are returned; a hit whose file has since
+    been removed or edited is skipped and flags the index as ``stale``. Once masked
+    passages outnumber live ones, an update reindexes everything into one segment.
+    """
+    
+    K1 = 1.2
+    B = 0.75
+    PASSAGE_WORDS = 120
+    EXTENSIONS = ('.md', '.txt')
+    
+    # Updates from several sessions in one process must not interleave
+    _update_lock = threading.Lock()
+    
+    def __init__(self, source_dir=KNOWLEDGE_DIR, index_dir=None):
+        self.source_dir = source_dir
+        self.index_dir = index_dir or os.path.join(DATA_DIR, 'knowledge_index')
+        self.stale = False
+        
+        # Searches on worker threads read whichever snapshot is current when they start;
+        # updates replace it with a single assignment
+        self.snapshot = IndexSnapshot(self.index_dir, self._read_manifest())
+    
+    def _read_manifest(self):
+        manifest_path = os.path.join(self.index_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                return json.load(f)
+        return {'files': {}, 'paths': [], 'segments': [], 'removed': []}
+    
+    def _scan(self):
+        for root, _, files in os.walk(self.source_dir):
+            for name in sorted(files):
+                if name.lower().endswith(self.EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, self.source_dir).replace(os.sep, '/'), os.stat(path)
+    
+    def _passages(self, file_id, text):
+        """Split a document into passages of about PASSAGE_WORDS words along paragraph breaks"""
+        
+        passages, start, end, tokens, has_body = [], None, None, [], False
+        for block in re.finditer(r'(?:[^\n]*\S[^\n]*(?:\n|$))+', text):
+            block_tokens = tokenize(block.group())
+            heading = block.group().lstrip().startswith('#')
+            
+            # Headings open a new passage (and stay with the text under them)
+            if has_body and (heading or len(tokens) + len(block_tokens) > self.PASSAGE_WORDS):
+                passages.append((file_id, start, end, tokens))
+                start, tokens, has_body = None, [], False
+            if start is None:
+                start = block.start()
+            end = block.end()
+            tokens = tokens + block_tokens
+            has_body = has_body or not heading
+        if tokens:
+            passages.append((file_id, start, end, tokens))
+        return passages
+    
+    def update(self):
+        """Index new and changed documents; returns the number of files indexed or dropped"""
+        
+        with self._update_lock:
+            # Another session may have updated the index since this one loaded it
+            manifest = self._read_manifest()
+            files = manifest['files']
+            stats = dict(self._scan())
+            changed = [
+                (relpath, stat) for relpath, stat in stats.items()
+                if relpath not in files or files[relpath]['mtime'] != stat.st_mtime or files[relpath]['size'] != stat.st_size
+            ]
+            gone = [relpath for relpath in files if relpath not in stats]
+            if not changed and not gone:
+                self.snapshot = IndexSnapshot(self.index_dir, manifest)
+                self.stale = False
+                return 0
+            
+            # Superseded versions of a file are masked by file id, never rewritten
+            for relpath in gone + [relpath for relpath, _ in changed if relpath in files]:
+                manifest['removed'].append(files.pop(relpath)['id'])
+            
+            # Once masked passages dominate, every document is reindexed into a fresh segment
+            obsolete = []
+            current = IndexSnapshot(self.index_dir, manifest)
+            if current.n_masked > current.n_passages:
+                obsolete = manifest['segments']
+                manifest = {'files': {}, 'paths': [], 'segments': [], 'removed': [],
+                            'next_segment': manifest.get('next_segment', len(obsolete))}
+                files = manifest['files']
+                changed = list(stats.items())
+            
+            passages = []
+            for relpath, stat in changed:
+                file_id = len(manifest['paths'])
+                manifest['paths'].append(relpath)
+                files[relpath] = {'id': file_id, 'mtime': stat.st_mtime, 'size': stat.st_size}
+                with open(os.path.join(self.source_dir, relpath), encoding='utf-8', errors='replace') as f:
+                    passages.extend(self._passages(file_id, f.read()))
+            
+            if passages:
+                number = manifest.get('next_segment', len(manifest['segments']))
+                name = f"segment_{number:05d}"
+                IndexSegment.write(os.path.join(self.index_dir, name), passages)
+                manifest['segments'].append(name)
+                manifest['next_segment'] = number + 1
+            
+            # The manifest is swapped in atomically, so readers never see a partial update
+            os.makedirs(self.index_dir, exist_ok=True)
+            manifest_path = os.path.join(self.index_dir, 'manifest.json')
+            with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(manifest_path + '.tmp', manifest_path)
+            
+            self.snapshot = IndexSnapshot(self.index_dir, manifest)
+            self.stale = False
+            
+            # Segments still open in older snapshots keep their memory maps
+            for name in obsolete:
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+            return len(changed) + len(gone)
+    
+    def search(self, query, k=3):
+        """Top-k passages for a query as dicts with score, source path and text"""
+        
+        snapshot = self.snapshot
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not snapshot.n_passages:
+            return []
+        
+        # Document frequencies count live passages only and are summed over segments
+        # before any scoring
+        postings = [[segment.postings(term) for term in terms] for segment in snapshot.segments]
+        df = [
+            sum(int(np.count_nonzero(live[hits[i][0]])) for hits, live in zip(postings, snapshot.live) if hits[i] is not None)
+            for i in range(len(terms))
+        ]
+        idf = [np.log(1 + (snapshot.n_passages - n + 0.5) / (n + 0.5)) for n in df]
+        
+        candidates = []
+        for segment_id, (segment, hits, live) in enumerate(zip(snapshot.segments, postings, snapshot.live)):
+            if all(hit is None for hit in hits):
+                continue
+            scores = np.zeros(len(segment), dtype=np.float32)
+            norm = self.K1 * (1 - self.B + self.B * np.asarray(segment.lengths) / snapshot.avg_length)
+            for term_idf, hit in zip(idf, hits):
+                if hit is None:
+                    continue
+                passages, frequencies = hit
+                scores[passages] += term_idf * frequencies * (self.K1 + 1) / (frequencies + norm[passages])
+            scores[~live] = 0
+            
+            top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+            candidates.extend((float(scores[i]), segment_id, int(i)) for i in top if scores[i] > 0)
+        
+        results = []
+        for score, segment_id, passage in sorted(candidates, reverse=True):
+            if len(results) == k:
+                break
+            segment = snapshot.segments[segment_id]
+            relpath = snapshot.manifest['paths'][int(segment.file_ids[passage])]
+            text = self._read_passage(snapshot.manifest['files'].get(relpath), relpath,
+                                      int(segment.starts[passage]), int(segment.ends[passage]))
+            if text is None:
+                self.stale = True
+                continue
+            results.append({'score': score, 'path': relpath, 'text': text.strip()})
+        return results
+    
+    def _read_passage(self, entry, relpath, start, end):
+        """Passage text from its source file, or None if the file is gone or has changed since indexing"""
+        
+        path = os.path.join(self.source_dir, relpath)
+        try:
+            stat = os.stat(path)
+            if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                return None
+            with open(path, encoding='utf-8', errors='replace') as f:
+                return f.read()[start:end]
+        except OSError:
+            return None
+    
+    def __len__(self):
+        return self.snapshot.n_passages
@@ -0,0 +1,227 @@
+"""
+Rolling-Window Kernels for Smart Manufacturing Dashboard
+Vectorized rolling statistics over whole (series x time) matrices in a single call
+"""
+
+import warnings
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# 'valid' keeps only full windows (like np.convolve); 'same' keeps every time step, with
+# the leading steps computed over the partial windows available (pandas min_periods=1)
+MODES = ('valid', 'same')
+
+# Window elements rolling_quantile (and rolling_std's exact pass) materializes at once
+QUANTILE_BLOCK = 1 << 22
+
+# rolling_std recomputes a window exactly when its sum of squared deviations is within
+# this factor of the rounding error bound of the cumulative sums it came from
+STD_RECHECK = 1 << 20
+
+
+def _prepare(x, window, mode, out, dtype):
+    """
+    2-D input, effective window, 2-D output buffer and the array to hand back.
+    1-D series are treated as a single row and returned as 1-D.
+    """
+    
+    x = np.asarray(x)
+    squeeze = x.ndim == 1
+    if squeeze:
+        x = x[np.newaxis]
+    if x.ndim != 2:
+        raise ValueError("Expected a 1-D series or a (series x time) matrix")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    
+    n, t = x.shape
+    if mode == 'same':
+        window = min(window, t)
+    if not 1 <= window <= t:
+        raise ValueError(f"window must be between 1 and the series length ({t})")
+    width = t - window + 1 if mode == 'valid' else t
+    
+    if out is None:
+        if dtype is None:
+            dtype = x.dtype if x.dtype in (np.float32, np.float64) else np.float64
+        out = np.empty((width,) if squeeze else (n, width), dtype=dtype)
+    elif out.shape != ((width,) if squeeze else (n, width)):
+        raise ValueError(f"out has shape {out.shape}, expected {(width,) if squeeze else (n, width)}")
+    
+    return x, window, out[np.newaxis] if squeeze else out, out
+
+
+def _window_sums(x, window, mode, out=None):
+    """
+    Window sums from a float64 cumulative sum (float32 inputs are accumulated in float64
+    so long series do not drift); written into ``out`` when given
+    """
+    
+    n, t = x.shape
+    totals = np.zeros((n, t + 1))
+    np.cumsum(x, axis=1, dtype=np.float64, out=totals[:, 1:])
+    
+    if out is None:
+        out = np.empty((n, t - window + 1 if mode == 'valid' else t))
+    if mode == 'same':
+        out[:, :window - 1] = totals[:, 1:window]
+    np.subtract(totals[:, window:], totals[:, :t - window + 1], out=out[:, window - 1:] if mode == 'same' else out)
+    return out
+
+
+def _window_counts(x, window, mode):
+    """Samples per window: a scalar or per-step row for finite input, a full matrix with gaps"""
+    
+    t = x.shape[1]
+    missing = np.isnan(x) if np.issubdtype(x.dtype, np.floating) else None
+    if missing is not None and missing.any():
+        return _window_sums(~missing, window, mode), missing
+    if mode == 'valid':
+        return float(window), None
+    return np.minimum(np.arange(1, t + 1), window).astype(float), None
+
+
+def rolling_sum(x, window, mode='valid', out=None, dtype=None):
+    """Rolling sum along the time axis; NaNs are skipped, all-NaN windows give NaN"""
+    
+    x, window, target, result = _prepare(x, window, mode, out, dtype)
+    counts, missing = _window_counts(x, window, mode)
+    if missing is not None:
+        x = np.where(missing, 0, x)
+    
+    _window_sums(x, window, mode, target)
+    if missing is not None:
+        target[counts == 0] = np.nan
+    return result
+
+
+def rolling_mean(x, window, mode='valid', out=None, dtype=None):
+    """Rolling mean along the time axis over the finite samples of each window"""
+    
+    x, window, target, result = _prepare(x, window, mode, out, dtype)
+    counts, missing = _window_counts(x, window, mode)
+    if missing is not None:
+        x = np.where(missing, 0, x)
+    
+    _window_sums(x, window, mode, target)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(target, counts, out=target)
+    return result
+
+
+def rolling_std(x, window, ddof=0, mode='valid', out=None, dtype=None):
+    """
+    Rolling standard deviation along the time axis. The time axis is cut into blocks of
+    ``window`` steps; every window ending in a block lies within that block and the one
+    before it, so each such pair is centred on its own mean and cumulatively summed on
+    its own. Windows whose spread is still too small for those sums to resolve are
+    recomputed exactly with a two-pass over their samples (constant windows give 0).
+    """
+    
+    x, window, target, result = _prepare(x, window, mode, out, dtype)
+    counts, _ = _window_counts(x, window, 'same')
+    n, t = x.shape
+    blocks = -(-t // window)
+    
+    # One block of NaN in front, so block b's segment spans steps (b - 1) * window onwards
+    padded = np.full((n, (blocks + 1) * window), np.nan)
+    padded[:, window:window + t] = x
+    segments = sliding_window_view(padded, 2 * window, axis=1)[:, ::window]
+    finite = ~np.isnan(segments)
+    filled = np.where(finite, segments, 0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = filled.sum(axis=-1, keepdims=True) / np.maximum(finite.sum(axis=-1, keepdims=True), 1)
+        centred = np.where(finite, filled - shift, 0)
+        squared = np.square(centred)
+        
+        totals = np.zeros(centred.shape[:2] + (2 * window + 1,))
+        np.cumsum(centred, axis=-1, out=totals[:, :, 1:])
+        sums = (totals[:, :, window + 1:] - totals[:, :, 1:window + 1]).reshape(n, -1)[:, :t]
+        np.cumsum(squared, axis=-1, out=totals[:, :, 1:])
+        squares = (totals[:, :, window + 1:] - totals[:, :, 1:window + 1]).reshape(n, -1)[:, :t]
+        deviation = squares - sums * sums / counts
+        
+        # Rounding error of a cumulative sum grows with its length and its largest total
+        bound = 4 * window * np.finfo(np.float64).eps * totals[:, :, -1:]
+        bound = np.broadcast_to(bound, (n, blocks, window)).reshape(n, -1)[:, :t]
+        rows, cols = np.nonzero((deviation <= STD_RECHECK * bound) & (counts > ddof))
+        views = sliding_window_view(padded[:, 1:window + t], window, axis=1)
+        step = max(1, QUANTILE_BLOCK // window)
+        for start in range(0, len(rows), step):
+            samples = views[rows[start:start + step], cols[start:start + step]]
+            centre = np.nanmean(samples, axis=1, keepdims=True)
+            exact = np.nansum(np.square(samples - centre), axis=1)
+            exact[np.nanmax(samples, axis=1) == np.nanmin(samples, axis=1)] = 0
+            deviation[rows[start:start + step], cols[start:start + step]] = exact
+        
+        variance = np.clip(deviation, 0, None) / (counts - ddof)
+        variance[np.broadcast_to(counts - ddof <= 0, variance.shape)] = np.nan
+    
+    np.sqrt(variance[:, window - 1:] if mode == 'valid' else variance, out=target)
+    return result
+
+
+def _rolling_extreme(x, window, mode, out, dtype, op):
+    """
+    van Herk/Gil-Werman rolling extreme: prefix and suffix extremes within blocks of
+    ``window`` steps combine into any window's extreme with one more comparison, so the
+    cost per element stays constant whatever the window size. ``op`` is np.fmax/np.fmin,
+    which skip NaNs.
+    """
+    
+    x, window, target, result = _prepare(x, window, mode, out, dtype)
+    n, t = x.shape
+    blocks = -(-t // window)
+    padded = np.full((n, blocks * window), np.nan, dtype=target.dtype)
+    padded[:, :t] = x
+    padded = padded.reshape(n, blocks, window)
+    prefix = op.accumulate(padded, axis=2).reshape(n, -1)
+    suffix = op.accumulate(padded[:, :, ::-1], axis=2)[:, :, ::-1].reshape(n, -1)
+    
+    full = target[:, window - 1:] if mode == 'same' else target
+    op(suffix[:, :t - window + 1], prefix[:, window - 1:t], out=full)
+    if mode == 'same':
+        op.accumulate(padded.reshape(n, -1)[:, :window - 1], axis=1, out=target[:, :window - 1])
+    return result
+
+
+def rolling_min(x, window, mode='valid', out=None, dtype=None):
+    """Rolling minimum along the time axis (NaNs skipped)"""
+    return _rolling_extreme(x, window, mode, out, dtype, np.fmin)
+
+
+def rolling_max(x, window, mode='valid', out=None, dtype=None):
+    """Rolling maximum along the time axis (NaNs skipped)"""
+    return _rolling_extreme(x, window, mode, out, dtype, np.fmax)
+
+
+def rolling_quantile(x, window, q, mode='valid', out=None, dtype=None):
+    """
+    Rolling quantile (linear interpolation) along the time axis, computed on strided
+    window views in column blocks of about QUANTILE_BLOCK elements; NaNs are skipped
+    """
+    
+    x, window, target, result = _prepare(x, window, mode, out, dtype)
+    n = x.shape[0]
+    quantile = np.nanquantile if np.issubdtype(x.dtype, np.floating) and np.isnan(x).any() else np.quantile
+    
+    # Leading partial windows see NaN padding, which nanquantile ignores
+    full = target
+    if mode == 'same' and window > 1:
+        head = np.full((n, 2 * window - 2), np.nan)
+        head[:, window - 1:] = x[:, :window - 1]
+        full = target[:, window - 1:]
+    
+    views = sliding_window_view(x, window, axis=1)
+    step = max(1, QUANTILE_BLOCK // max(n * window, 1))
+    # All-NaN windows come out as NaN; nanquantile warns about each of them
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if mode == 'same' and window > 1:
+            target[:, :window - 1] = np.nanquantile(sliding_window_view(head, window, axis=1)[:, :window - 1], q, axis=-1)
+        for start in range(0, views.shape[1], step):
+            full[:, start:start + step] = quantile(views[:, start:start + step], q, axis=-1)
+    return result
@@ -0,0 +1,28 @@
+"""
+Local Storage for Smart Manufacturing Dashboard
+Embedded SQLite databases kept under the project's data/ directory
+"""
+
+import os
+import sqlite3
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def connect(name, path=None):
+    """
+    Open a SQLite database (``data/<name>`` unless ``path`` is given).
+    WAL journaling lets several dashboard sessions read while one writes.
+    """
+    
+    path = path or os.path.join(DATA_DIR, name)
+    if path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    # Streamlit reruns a session's script on different threads, so the
+    # connection is shared across threads and guarded by its owner
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
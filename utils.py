@@ -133,7 +133,7 @@ def generate_random_walk(n_points, start_value=100, volatility=0.02):
 
 
 def moving_average(data, window=5):
-    """Calculate moving average"""
+    """Calculate moving average (NaNs propagate; rolling_kernels.rolling_mean skips them)"""
     return np.convolve(data, np.ones(window)/window, mode='valid')
 
 
@@ -162,3 +162,337 @@ def normalize_data(data, min_val=0, max_val=100):
     scaled = normalized * (max_val - min_val) + min_val
     
     return scaled
+
+
+# Streaming counterparts of the batch helpers above. Each takes the same parameters as its
+# batch function; ``update(value)`` folds in one sample in O(1) time and memory and returns
+# the batch result for the newest sample, and ``extend(values)`` does the same for many.
+
+class RunningStats:
+    """
+    Welford mean and variance plus running min/max of a stream; like the other
+    streaming helpers, ``update`` returns the result after each sample (the running mean)
+    """
+    
+    def __init__(self, ddof=0):
+        self.ddof = ddof
+        self.count = 0
+        self.mean = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._m2 = 0.0
+    
+    def update(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        return self.mean
+    
+    def extend(self, values):
+        return np.array([self.update(value) for value in values])
+    
+    @property
+    def var(self):
+        return self._m2 / (self.count - self.ddof) if self.count > self.ddof else np.nan
+    
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+
+class MovingAverage:
+    """Streaming ``moving_average``: mean of the last ``window`` samples (None until full)"""
+    
+    def __init__(self, window=5):
+        self.window = window
+        self._buffer = np.zeros(window)
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+    
+    def update(self, value):
+        value = float(value)
+        self._sum += value - self._buffer[self._pos]
+        self._buffer[self._pos] = value
+        self._pos = (self._pos + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+        
+        # Re-summing once per lap keeps floating-point drift from accumulating (amortized O(1))
+        if self._pos == 0:
+            self._sum = float(self._buffer.sum())
+        
+        return self._sum / self.window if self._count == self.window else None
+    
+    def extend(self, values):
+        averages = [self.update(value) for value in values]
+        return np.array([average for average in averages if average is not None])
+
+
+class P2Quantile:
+    """
+    P-square estimate of one quantile (Jain & Chlamtac): five markers whose heights are
+    nudged with piecewise-parabolic steps, so no samples are kept. Exact below five samples.
+    """
+    
+    def __init__(self, q):
+        self.q = q
+        self.count = 0
+        self._heights = []
+        self._positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self._desired = [1.0, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5.0]
+        self._increments = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+    
+    def update(self, value):
+        value = float(value)
+        self.count += 1
+        heights, positions = self._heights, self._positions
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return self.value
+        
+        # Cell the sample falls in; the extreme markers track min and max
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if value < heights[i + 1])
+        
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+        
+        # Move the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1])
+                )
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = height
+                positions[i] += step
+        return self.value
+    
+    @property
+    def value(self):
+        if self.count == 0:
+            return np.nan
+        if self.count <= 5:
+            return float(np.percentile(self._heights, self.q * 100))
+        return self._heights[2]
+
+
+class IQROutlierDetector:
+    """Streaming ``detect_outliers_iqr``: flags samples outside the P-square quartile fences"""
+    
+    def __init__(self, k=1.5):
+        self.k = k
+        self._q1 = P2Quantile(0.25)
+        self._q3 = P2Quantile(0.75)
+    
+    @property
+    def bounds(self):
+        q1, q3 = self._q1.value, self._q3.value
+        return q1 - self.k * (q3 - q1), q3 + self.k * (q3 - q1)
+    
+    def update(self, value):
+        self._q1.update(value)
+        self._q3.update(value)
+        lower, upper = self.bounds
+        return bool(value < lower or value > upper)
+    
+    def extend(self, values):
+        return np.array([self.update(value) for value in values], dtype=bool)
+
+
+class RunningNormalizer:
+    """Streaming ``normalize_data``: scales samples by the min/max seen so far"""
+    
+    def __init__(self, min_val=0, max_val=100):
+        self.min_val = min_val
+        self.max_val = max_val
+        self.stats = RunningStats()
+    
+    def update(self, value):
+        self.stats.update(value)
+        span = self.stats.max - self.stats.min
+        if span == 0:
+            return (self.min_val + self.max_val) / 2
+        return (float(value) - self.stats.min) / span * (self.max_val - self.min_val) + self.min_val
+    
+    def extend(self, values):
+        return np.array([self.update(value) for value in values])
+
+
+# Approximate rendered widths (px) used to size point budgets when the real width is unknown
+CHART_WIDTHS = {'small': 450, 'medium': 700, 'large': 950, 'full': 1400}
+
+
+def point_budget(width_px=700, points_per_pixel=2):
+    """Number of points worth sending for a chart of the given pixel width"""
+    return max(int(width_px * points_per_pixel), 4)
+
+
+def _numeric_axis(x, n):
+    """Float positions for an x axis (numbers, datetimes, or row order as fallback)"""
+    if x is None:
+        return np.arange(n, dtype=float)
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(float)
+    return np.arange(n, dtype=float)
+
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the min and max of every bucket (about ``n_out`` points in total).
+    Keeps every peak and trough, so spikes never disappear from a decimated line.
+    """
+    
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    
+    # Equal-size buckets over the interior; first and last points are always kept
+    n_buckets = max((n_out - 2) // 2, 1)
+    size = -(-(n - 2) // n_buckets)
+    n_buckets = -(-(n - 2) // size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n - 2] = y[1:-1]
+    blocks = padded.reshape(n_buckets, size)
+    
+    # NaN padding (and gaps) are skipped; all-NaN buckets fall back to their first slot
+    filled_low = np.where(np.isnan(blocks), np.inf, blocks)
+    filled_high = np.where(np.isnan(blocks), -np.inf, blocks)
+    offsets = np.arange(n_buckets) * size + 1
+    lows = offsets + filled_low.argmin(axis=1)
+    highs = offsets + filled_high.argmax(axis=1)
+    
+    indices = np.concatenate([[0], lows, highs, [n - 1]])
+    return np.unique(indices[indices < n])
+
+
+def lttb_indices(y, n_out, x=None):
+    """
+    Largest-Triangle-Three-Buckets selection of ``n_out`` indices. Long inputs are
+    pre-reduced with min-max bucketing (4 candidates per output point), so the
+    sequential LTTB pass only ever scans a few thousand points.
+    """
+    
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    
+    xs = _numeric_axis(x, n)
+    candidates = np.arange(n)
+    if n > 4 * n_out:
+        candidates = minmax_indices(y, 4 * n_out)
+    cx, cy = xs[candidates], y[candidates]
+    m = len(candidates)
+    
+    # Bucket boundaries over the interior candidates
+    edges = np.linspace(1, m - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, m - 1
+    
+    # Average point of every bucket, used as the third triangle vertex
+    counts = np.diff(edges)
+    sums_x = np.add.reduceat(cx[:m - 1], edges[:-1])
+    sums_y = np.add.reduceat(np.nan_to_num(cy[:m - 1]), edges[:-1])
+    mean_x = np.append(sums_x / np.maximum(counts, 1), cx[-1])
+    mean_y = np.append(sums_y / np.maximum(counts, 1), cy[-1])
+    
+    prev = 0
+    for b in range(n_out - 2):
+        start, stop = edges[b], edges[b + 1]
+        if stop <= start:
+            selected[b + 1] = prev
+            continue
+        bx, by = cx[start:stop], cy[start:stop]
+        area = np.abs((cx[prev] - mean_x[b + 1]) * (by - cy[prev])
+                      - (cx[prev] - bx) * (mean_y[b + 1] - cy[prev]))
+        prev = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[b + 1] = prev
+    
+    return candidates[np.unique(selected)]
+
+
+def downsample(x, y, n_out=None, method='lttb', width_px=700):
+    """Reduce one series to a pixel-bounded point budget; returns (x, y)"""
+    
+    n_out = n_out or point_budget(width_px)
+    if len(y) <= n_out:
+        return x, y
+    
+    if method == 'minmax':
+        indices = minmax_indices(y, n_out)
+    else:
+        indices = lttb_indices(y, n_out, x)
+    
+    def take(values):
+        return values.iloc[indices] if hasattr(values, 'iloc') else np.asarray(values)[indices]
+    
+    return take(x), take(y)
+
+
+def downsample_frame(df, x, y_columns, n_out=None, method='lttb', width_px=700):
+    """
+    Reduce a frame for plotting several series against ``x``. Each series picks its
+    own points and the rows are the union, so every trace keeps its own peaks.
+    """
+    
+    n_out = n_out or point_budget(width_px)
+    if len(df) <= n_out:
+        return df
+    
+    # Scatter-style data is decimated along x, so order it first
+    x_values = df[x].to_numpy() if x is not None else None
+    order = None
+    sortable = x_values is not None and (np.issubdtype(x_values.dtype, np.number)
+                                         or np.issubdtype(x_values.dtype, np.datetime64))
+    if sortable and len(x_values) > 1 and not (x_values[1:] >= x_values[:-1]).all():
+        order = np.argsort(x_values, kind='stable')
+        x_values = x_values[order]
+    
+    per_series = max(n_out // max(len(y_columns), 1), 4)
+    selected = []
+    for column in y_columns:
+        values = df[column].to_numpy()
+        if order is not None:
+            values = values[order]
+        if not np.issubdtype(values.dtype, np.number):
+            continue
+        if method == 'minmax':
+            selected.append(minmax_indices(values, per_series))
+        else:
+            selected.append(lttb_indices(values, per_series, x_values))
+    
+    if not selected:
+        return df
+    
+    indices = np.unique(np.concatenate(selected))
+    if order is not None:
+        indices = order[indices]
+    return df.iloc[indices]
+
+
+def sort_positions(df, column, ascending=True):
+    """Row positions of ``df`` ordered by ``column`` (stable, missing values last)"""
+    values = df[column].reset_index(drop=True)
+    return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()